@@ -1,11 +1,18 @@
 import os
 import logging
 import urllib.parse
+from datetime import datetime
 from flask import Flask
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.orm import DeclarativeBase
 from werkzeug.middleware.proxy_fix import ProxyFix
 from utils.timezone import utc_to_ist
+from utils.storage import UploadRequest
+from utils.metrics import TimedQueuePool, init_metrics
+from utils.profiler import init_profiler
+from utils.replica import RoutingSession, init_replica, parse_route_lags
+from utils.assets import init_assets
+from utils.fragments import init_fragments
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -15,7 +22,8 @@ class Base(DeclarativeBase):
     pass
 
 
-db = SQLAlchemy(model_class=Base)
+# Sessions send reads in replica routes to the read replica (utils/replica.py)
+db = SQLAlchemy(model_class=Base, session_options={"class_": RoutingSession})
 
 
 def get_database_uri():
@@ -32,19 +40,146 @@ def get_database_uri():
 
 # Create the app
 app = Flask(__name__)
+app.request_class = UploadRequest
 app.secret_key = os.environ.get("SESSION_SECRET") or "fallback-dev-key-12345"
-app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
+
+# Number of reverse proxies in front of the app; only the X-Forwarded-For hops
+# they appended are believed when working out the client address
+app.wsgi_app = ProxyFix(app.wsgi_app, x_for=int(os.environ.get("TRUSTED_PROXIES", 1)), x_proto=1, x_host=1)
 
 # Configure the database - PostgreSQL primary database
 app.config["SQLALCHEMY_DATABASE_URI"] = get_database_uri()
 app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
     "pool_recycle": 300,
     "pool_pre_ping": True,
+    # QueuePool that also records checkout wait times for /metrics
+    "poolclass": TimedQueuePool,
 }
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
+# Optional read replica: SELECTs in the routes listed in REPLICA_ROUTES
+# (endpoint=max lag in seconds) go to it while its lag is within that route's
+# limit, checked every REPLICA_LAG_CHECK_INTERVAL seconds. A browser session
+# reads from the primary until the replica has caught up with its last write
+# (plus REPLICA_WRITE_MARGIN seconds)
+app.config["REPLICA_DATABASE_URL"] = os.environ.get("REPLICA_DATABASE_URL", "")
+if app.config["REPLICA_DATABASE_URL"]:
+    app.config["SQLALCHEMY_BINDS"] = {"replica": app.config["REPLICA_DATABASE_URL"]}
+app.config["REPLICA_ROUTES"] = parse_route_lags(os.environ.get(
+    "REPLICA_ROUTES",
+    "reports_dashboard=300,download_excel_report=300,manage_users=60,view_user=30,super_admin_dashboard=15"))
+app.config["REPLICA_LAG_CHECK_INTERVAL"] = float(os.environ.get("REPLICA_LAG_CHECK_INTERVAL", 5))
+app.config["REPLICA_WRITE_MARGIN"] = float(os.environ.get("REPLICA_WRITE_MARGIN", 2))
+
+# Seconds a worker may serve cached dashboard stats before re-querying
+app.config["STATS_CACHE_TTL"] = int(os.environ.get("STATS_CACHE_TTL", 30))
+
+# Rows per page on keyset-paginated listings
+app.config["PAGE_SIZE"] = int(os.environ.get("PAGE_SIZE", 25))
+
+# Comments per page on the ticket view and its "load older comments" endpoint
+app.config["COMMENTS_PAGE_SIZE"] = int(os.environ.get("COMMENTS_PAGE_SIZE", 20))
+
+# Most tickets one bulk status/assignment request may change
+app.config["BULK_MAX_TICKETS"] = int(os.environ.get("BULK_MAX_TICKETS", 1000))
+
+# Processes that hash passwords during a bulk user import (0 = one per CPU core)
+app.config["USER_IMPORT_WORKERS"] = int(os.environ.get("USER_IMPORT_WORKERS", 0))
+# Most CSV rows one web upload may import; bigger files go through `flask import-users`
+app.config["USER_IMPORT_MAX_ROWS"] = int(os.environ.get("USER_IMPORT_MAX_ROWS", 100))
+
+# Uploads are streamed to disk and stored once per distinct content
+app.config["UPLOAD_FOLDER"] = os.environ.get("UPLOAD_FOLDER", os.path.join(app.root_path, "uploads"))
+app.config["MAX_UPLOAD_SIZE"] = int(os.environ.get("MAX_UPLOAD_SIZE", 25 * 1024 * 1024))
+app.config["MAX_CONTENT_LENGTH"] = int(os.environ.get("MAX_CONTENT_LENGTH", 100 * 1024 * 1024))
+
+# Attachment downloads: private cache lifetime for content-addressed files, and
+# optionally let the front proxy send the bytes ("x-accel-redirect" for nginx,
+# "x-sendfile" for Apache/lighttpd) after the permission check
+app.config["UPLOAD_CACHE_MAX_AGE"] = int(os.environ.get("UPLOAD_CACHE_MAX_AGE", 365 * 24 * 3600))
+app.config["UPLOAD_OFFLOAD"] = os.environ.get("UPLOAD_OFFLOAD", "").lower()
+app.config["UPLOAD_ACCEL_PREFIX"] = os.environ.get("UPLOAD_ACCEL_PREFIX", "/protected-uploads/")
+
+# Image previews: pool processes that render them in the background
+app.config["THUMBNAIL_WORKERS"] = int(os.environ.get("THUMBNAIL_WORKERS", 2))
+
+# Live dashboard updates: how often each worker checks for ticket changes, how
+# often an idle event stream sends a keepalive, how long one stream stays open
+# (keep it under gunicorn's 30 s worker timeout) and how soon the browser reconnects
+app.config["SSE_POLL_INTERVAL"] = float(os.environ.get("SSE_POLL_INTERVAL", 3))
+app.config["SSE_KEEPALIVE"] = int(os.environ.get("SSE_KEEPALIVE", 20))
+app.config["SSE_STREAM_SECONDS"] = int(os.environ.get("SSE_STREAM_SECONDS", 25))
+app.config["SSE_RETRY_MS"] = int(os.environ.get("SSE_RETRY_MS", 1000))
+
+# Seconds between a visible user dashboard's checks of its JSON API (super admin
+# dashboards get the event stream above)
+app.config["DASHBOARD_POLL_INTERVAL"] = int(os.environ.get("DASHBOARD_POLL_INTERVAL", 60))
+
+# Trust the role stored in the signed session, re-validated against the
+# user's auth version at most once per AUTH_SNAPSHOT_TTL seconds per worker
+# (super admin sessions every AUTH_ADMIN_SNAPSHOT_TTL seconds)
+app.config["AUTH_TRUST_SESSION"] = os.environ.get("AUTH_TRUST_SESSION", "true").lower() == "true"
+app.config["AUTH_SNAPSHOT_TTL"] = int(os.environ.get("AUTH_SNAPSHOT_TTL", 60))
+app.config["AUTH_ADMIN_SNAPSHOT_TTL"] = int(os.environ.get("AUTH_ADMIN_SNAPSHOT_TTL", 5))
+
+# Password hashing: werkzeug method string with its cost parameters (stored
+# hashes made with other parameters are upgraded at the next login), and how
+# many hashes a worker process runs at once before logins wait
+app.config["PASSWORD_HASH_METHOD"] = os.environ.get("PASSWORD_HASH_METHOD", "scrypt:32768:8:1")
+app.config["PASSWORD_HASH_CONCURRENCY"] = int(os.environ.get("PASSWORD_HASH_CONCURRENCY", os.cpu_count() or 1))
+app.config["PASSWORD_HASH_TIMEOUT"] = float(os.environ.get("PASSWORD_HASH_TIMEOUT", 5))
+
+# Login attempts allowed per minute, and burst size, per username and per client IP
+app.config["LOGIN_USER_RATE"] = float(os.environ.get("LOGIN_USER_RATE", 5))
+app.config["LOGIN_USER_BURST"] = int(os.environ.get("LOGIN_USER_BURST", 5))
+app.config["LOGIN_IP_RATE"] = float(os.environ.get("LOGIN_IP_RATE", 300))
+app.config["LOGIN_IP_BURST"] = int(os.environ.get("LOGIN_IP_BURST", 100))
+
+# Outgoing email (assignment notifications), sent by background workers
+app.config["MAIL_ENABLED"] = os.environ.get("MAIL_ENABLED", "true").lower() == "true"
+app.config["MAIL_SERVER"] = os.environ.get("MAIL_SERVER", "smtp.gmail.com")
+app.config["MAIL_PORT"] = int(os.environ.get("MAIL_PORT", 587))
+app.config["MAIL_USE_TLS"] = os.environ.get("MAIL_USE_TLS", "true").lower() == "true"
+app.config["MAIL_USERNAME"] = os.environ.get("MAIL_USERNAME", "")
+app.config["MAIL_PASSWORD"] = os.environ.get("MAIL_PASSWORD", "")
+app.config["MAIL_DEFAULT_SENDER"] = os.environ.get("MAIL_DEFAULT_SENDER", "")
+app.config["MAIL_TIMEOUT"] = int(os.environ.get("MAIL_TIMEOUT", 30))
+app.config["MAIL_WORKERS"] = int(os.environ.get("MAIL_WORKERS", 1))
+app.config["MAIL_BATCH_SIZE"] = int(os.environ.get("MAIL_BATCH_SIZE", 50))
+app.config["MAIL_MAX_RETRIES"] = int(os.environ.get("MAIL_MAX_RETRIES", 5))
+app.config["MAIL_RETRY_BACKOFF"] = float(os.environ.get("MAIL_RETRY_BACKOFF", 10))
+
+# Lifetime of fingerprinted static files from `flask build-assets` (static/dist)
+app.config["ASSET_MAX_AGE"] = int(os.environ.get("ASSET_MAX_AGE", 365 * 24 * 3600))
+
+# Rendered dashboard ticket rows, reused until the ticket changes: entries kept
+# per worker, plus an optional SQLite file shared by all workers on the host
+app.config["FRAGMENT_CACHE_ENABLED"] = os.environ.get("FRAGMENT_CACHE_ENABLED", "true").lower() == "true"
+app.config["FRAGMENT_CACHE_SIZE"] = int(os.environ.get("FRAGMENT_CACHE_SIZE", 5000))
+app.config["FRAGMENT_CACHE_PATH"] = os.environ.get("FRAGMENT_CACHE_PATH", "")
+app.config["FRAGMENT_CACHE_DISK_ENTRIES"] = int(os.environ.get("FRAGMENT_CACHE_DISK_ENTRIES", 100000))
+
+# Prometheus metrics: per-worker unless METRICS_DIR names a directory shared by
+# all workers (cleared on deploy), which /metrics then sums. Without a bearer
+# token /metrics only answers requests from this host
+app.config["METRICS_DIR"] = os.environ.get("METRICS_DIR", "")
+app.config["METRICS_FLUSH_INTERVAL"] = float(os.environ.get("METRICS_FLUSH_INTERVAL", 5))
+app.config["METRICS_TOKEN"] = os.environ.get("METRICS_TOKEN", "")
+
+# SQL profiling: per-request statement counts, DB time and N+1 warnings (log
+# line plus Server-Timing header), and a JSON slow-query log ("sql.slow"
+# logger) for statements over SQL_SLOW_QUERY_MS (0 turns it off)
+app.config["SQL_PROFILER"] = os.environ.get("SQL_PROFILER", "false").lower() == "true"
+app.config["SQL_N_PLUS_ONE_THRESHOLD"] = int(os.environ.get("SQL_N_PLUS_ONE_THRESHOLD", 5))
+app.config["SQL_SLOW_QUERY_MS"] = float(os.environ.get("SQL_SLOW_QUERY_MS", 500))
+
 # Initialize the app with the extension
 db.init_app(app)
+init_replica(app, db)
+init_metrics(app, db)
+init_profiler(app)
+init_assets(app)
+init_fragments(app)
 
 @app.template_filter('to_ist')
 def to_ist_filter(dt):
@@ -54,6 +189,13 @@ def to_ist_filter(dt):
             return converted_dt.strftime('%Y-%m-%d %H:%M:%S')
     return ''
 
+@app.template_filter('strftime')
+def strftime_filter(value, fmt='%Y-%m-%d %H:%M:%S'):
+    """Format a datetime, or the string produced by to_ist, with a custom format"""
+    if isinstance(value, str):
+        value = datetime.strptime(value, '%Y-%m-%d %H:%M:%S') if value else None
+    return value.strftime(fmt) if value else ''
+
 # Add custom Jinja2 filter for line breaks
 @app.template_filter('nl2br')
 def nl2br_filter(s):
@@ -61,9 +203,6 @@ def nl2br_filter(s):
     return s.replace('\n', '<br>\n') if s else s
 
 
-with app.app_context():
-    # Make sure to import the models here or their tables won't be created
-    import models  # noqa: F401
-
-    db.create_all()
-    logging.info("Database tables created")
+# No database access at import time: every worker imports this module. Create
+# the schema and default accounts once per deploy with `flask init-db`
+# (utils/schema.py) before starting the workers.
@@ -1,5 +1,5 @@
 from flask_wtf import FlaskForm
-from flask_wtf.file import FileField, FileAllowed
+from flask_wtf.file import FileField, FileAllowed, FileRequired
 from wtforms import  TextAreaField, SelectField, SubmitField, EmailField
 from wtforms.validators import DataRequired, Email, Length, EqualTo
 from models import User
@@ -7,7 +7,7 @@ from flask_wtf import FlaskForm
 from wtforms import StringField, SelectField, SubmitField, PasswordField
 from wtforms.fields import EmailField
 from wtforms.validators import DataRequired, Email, Length, Optional
-from wtforms import SelectField
+from wtforms import SelectField, HiddenField, BooleanField
 
 class LoginForm(FlaskForm):
     username = StringField('Username', validators=[DataRequired(), Length(min=3, max=80)])
@@ -90,3 +90,32 @@ class AssignTicketForm(FlaskForm):
     def __init__(self, *args, **kwargs):
         super(AssignTicketForm, self).__init__(*args, **kwargs)
         self.assigned_to.choices = [(user.id, user.full_name) for user in User.query.filter_by(role='super_admin').all()]
+
+class BulkStatusForm(FlaskForm):
+    ticket_ids = HiddenField('Tickets', validators=[Optional()])  # comma-separated ticket IDs
+    filters = HiddenField('Filters')  # the dashboard's query string, used with select_all
+    select_all = BooleanField('All tickets matching the current filters')
+    status = SelectField('Status', choices=[
+        ('Open', 'Open'),
+        ('In Progress', 'In Progress'),
+        ('Resolved', 'Resolved'),
+        ('Closed', 'Closed')
+    ], validators=[DataRequired()])
+    comment = TextAreaField('Comment (Optional)', validators=[Optional(), Length(max=1000)])
+    submit = SubmitField('Update Tickets')
+
+class BulkAssignForm(FlaskForm):
+    ticket_ids = HiddenField('Tickets', validators=[Optional()])  # comma-separated ticket IDs
+    filters = HiddenField('Filters')  # the dashboard's query string, used with select_all
+    select_all = BooleanField('All tickets matching the current filters')
+    assigned_to = SelectField('Assign To', coerce=int, validators=[DataRequired()])
+    comment = TextAreaField('Comment (Optional)', validators=[Optional(), Length(max=1000)])
+    submit = SubmitField('Assign Tickets')
+    
+    def __init__(self, *args, **kwargs):
+        super(BulkAssignForm, self).__init__(*args, **kwargs)
+        self.assigned_to.choices = [(user.id, user.full_name) for user in User.query.filter_by(role='super_admin').all()]
+
+class UserImportForm(FlaskForm):
+    csv_file = FileField('Users CSV', validators=[FileRequired(), FileAllowed(['csv'], 'CSV files only!')])
+    submit = SubmitField('Import Users')
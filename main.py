@@ -1,5 +1,13 @@
 from app import app
 import routes  # noqa: F401
+from utils.schema import init_db
+from utils.cli import defer_commands
+
+# Development-only commands: flask bench-startup, bench-routes and generate-data
+defer_commands(app, 'utils.benchmark', 'utils.datagen')
 
 if __name__ == "__main__":
+    # Development server: a single process, so it can prepare the database itself
+    with app.app_context():
+        init_db()
     app.run(host="0.0.0.0", port=5000, debug=True)
@@ -1,6 +1,10 @@
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from sqlalchemy import DDL, case, event, func, or_
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import joinedload, selectinload
+from werkzeug.security import check_password_hash
 from app import db
+from utils.passwords import hash_password
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -17,15 +21,26 @@ class User(db.Model):
     system_name = db.Column(db.String(100), nullable=True)
     profile_image = db.Column(db.String(200), nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Last change to the row; API ETags use it to notice renamed users
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    __table_args__ = (
+        # manage_users pages through users by the (created_at, id) keyset
+        db.Index('idx_users_created_at_id', 'created_at', 'id'),
+    )
     
-    # Relationship with tickets
-    tickets = db.relationship('Ticket', backref='user', lazy=True, foreign_keys='Ticket.user_id')
-    assigned_tickets = db.relationship('Ticket', backref='assignee', lazy=True, foreign_keys='Ticket.assigned_to')
-    assignments_made = db.relationship('Ticket', backref='assigner', lazy=True, foreign_keys='Ticket.assigned_by')
+    # Relationship with tickets. Both sides load lazily by default; listing
+    # views pick an eager strategy with the Ticket.*_options() helpers below
+    tickets = db.relationship('Ticket', backref=db.backref('user', lazy='select'),
+                              lazy='select', foreign_keys='Ticket.user_id')
+    assigned_tickets = db.relationship('Ticket', backref=db.backref('assignee', lazy='select'),
+                                       lazy='select', foreign_keys='Ticket.assigned_to')
+    assignments_made = db.relationship('Ticket', backref=db.backref('assigner', lazy='select'),
+                                       lazy='select', foreign_keys='Ticket.assigned_by')
     
     def set_password(self, password):
         """Set password hash"""
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = hash_password(password)
     
     def check_password(self, password):
         """Check password against hash"""
@@ -50,9 +65,11 @@ class Ticket(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(200), nullable=False)
     description = db.Column(db.Text, nullable=False)
-    category = db.Column(db.String(50), nullable=False)  # Hardware, Software, Network, Other
-    priority = db.Column(db.String(20), nullable=False)  # Low, Medium, High, Critical
-    status = db.Column(db.String(20), nullable=False, default='Open')  # Open, In Progress, Resolved, Closed
+    # active_history keeps the previous value on change so utils.rollups can
+    # move the ticket out of its old daily rollup row
+    category = db.column_property(db.Column(db.String(50), nullable=False), active_history=True)  # Hardware, Software, Network, Other
+    priority = db.column_property(db.Column(db.String(20), nullable=False), active_history=True)  # Low, Medium, High, Critical
+    status = db.column_property(db.Column(db.String(20), nullable=False, default='Open'), active_history=True)  # Open, In Progress, Resolved, Closed
     
     # User system information captured at ticket creation
     user_name = db.Column(db.String(100), nullable=False)  # Full name of user who created ticket
@@ -61,7 +78,8 @@ class Ticket(db.Model):
     
     # Image attachment
     image_filename = db.Column(db.String(255), nullable=True)  # Filename of uploaded image
-    attachments = db.relationship('Attachment', backref='ticket', lazy=True)
+    image_sha256 = db.Column(db.String(64), nullable=True)  # Content hash of the image blob (NULL for legacy uploads)
+    attachments = db.relationship('Attachment', backref='ticket', lazy='select')
 
    # assigned_at = db.Column(db.DateTime)  # Add this line if not present
 
@@ -75,8 +93,62 @@ class Ticket(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     resolved_at = db.Column(db.DateTime, nullable=True)
     
+    # Comment counters, so listings never touch ticket_comments. Kept current
+    # by the TicketComment insert/delete events below and by utils.bulk
+    comment_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    last_comment_at = db.Column(db.DateTime, nullable=True)
+    
+    # Full-text search document over title, description and comments.
+    # PostgreSQL keeps a weighted tsvector here (GIN indexed); SQLite uses the
+    # tickets_fts FTS5 table below instead. Maintained by utils.search.
+    search_vector = db.deferred(db.Column(db.Text().with_variant(TSVECTOR(), 'postgresql'), nullable=True))
+    
+    __table_args__ = (
+        # Listing access paths: status filters, "my tickets", assignee queues
+        # (filtered by status, and paged newest first on view_user), and the
+        # (created_at, id) keyset used for pagination
+        db.Index('idx_tickets_status_created_at', 'status', 'created_at'),
+        db.Index('idx_tickets_user_id_created_at', 'user_id', 'created_at'),
+        db.Index('idx_tickets_assigned_to_status', 'assigned_to', 'status'),
+        db.Index('idx_tickets_assigned_to_created_at_id', 'assigned_to', 'created_at', 'id'),
+        db.Index('idx_tickets_created_at_id', 'created_at', 'id'),
+        # Live dashboard updates poll for recently changed tickets
+        db.Index('idx_tickets_updated_at', 'updated_at'),
+        # view_image looks tickets up by file name
+        db.Index('idx_tickets_image_filename', 'image_filename'),
+        db.Index('idx_tickets_search_vector', 'search_vector', postgresql_using='gin').ddl_if(dialect='postgresql'),
+    )
+    
     # Relationship with comments
-    comments = db.relationship('TicketComment', backref='ticket', lazy=True, cascade='all, delete-orphan')
+    comments = db.relationship('TicketComment', backref='ticket', lazy='select', cascade='all, delete-orphan',
+                               order_by='TicketComment.created_at')
+    
+    # Loading strategies per view. Single users are joined into the ticket
+    # SELECT; collections are fetched with one extra IN query for the page.
+    @classmethod
+    def report_options(cls):
+        """Reports table: shows the assignee"""
+        return [joinedload(cls.assignee)]
+    
+    @classmethod
+    def listing_options(cls):
+        """Dashboard ticket cards: assignee plus the attachment indicator"""
+        return [joinedload(cls.assignee), selectinload(cls.attachments)]
+    
+    @classmethod
+    def export_options(cls):
+        """Export rows: creator, assignee and assigner"""
+        return [joinedload(cls.user), joinedload(cls.assignee), joinedload(cls.assigner)]
+    
+    @classmethod
+    def detail_options(cls):
+        """Ticket detail page: people and attachments (comments are paged separately)"""
+        return [
+            joinedload(cls.user),
+            joinedload(cls.assignee),
+            joinedload(cls.assigner),
+            selectinload(cls.attachments),
+        ]
     
     @property
     def ticket_number(self):
@@ -85,6 +157,14 @@ class Ticket(db.Model):
     def __repr__(self):
         return f'<Ticket {self.ticket_number}: {self.title}>'
 
+# SQLite full-text index for local runs; rowid is the ticket id
+event.listen(
+    Ticket.__table__,
+    'after_create',
+    DDL("CREATE VIRTUAL TABLE IF NOT EXISTS tickets_fts "
+        "USING fts5(title, description, comments, tokenize='porter unicode61')").execute_if(dialect='sqlite')
+)
+
 class TicketComment(db.Model):
     __tablename__ = 'ticket_comments'
     
@@ -94,16 +174,90 @@ class TicketComment(db.Model):
     comment = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    __table_args__ = (
+        # Newest-first keyset pages of one ticket's thread
+        db.Index('idx_comments_ticket_created_id', 'ticket_id', 'created_at', 'id'),
+    )
+    
     # Relationship
-    user = db.relationship('User', backref='comments')
+    user = db.relationship('User', backref=db.backref('comments', lazy='select'), lazy='select')
+    
+    @classmethod
+    def listing_options(cls):
+        """Comment threads: every rendered comment shows its author"""
+        return [joinedload(cls.user)]
     
     def __repr__(self):
         return f'<Comment {self.id} on Ticket {self.ticket_id}>'
 
+
+@event.listens_for(TicketComment, 'after_insert')
+def _count_comment(mapper, connection, comment):
+    tickets = Ticket.__table__
+    connection.execute(
+        tickets.update()
+        .where(tickets.c.id == comment.ticket_id)
+        .values(comment_count=tickets.c.comment_count + 1,
+                updated_at=tickets.c.updated_at,  # counters alone don't count as an edit
+                last_comment_at=case((or_(tickets.c.last_comment_at.is_(None),
+                                          tickets.c.last_comment_at < comment.created_at), comment.created_at),
+                                     else_=tickets.c.last_comment_at))
+    )
+
+
+@event.listens_for(TicketComment, 'after_delete')
+def _uncount_comment(mapper, connection, comment):
+    tickets, comments = Ticket.__table__, TicketComment.__table__
+    connection.execute(
+        tickets.update()
+        .where(tickets.c.id == comment.ticket_id)
+        .values(comment_count=tickets.c.comment_count - 1,
+                updated_at=tickets.c.updated_at,
+                last_comment_at=db.select(func.max(comments.c.created_at))
+                .where(comments.c.ticket_id == comment.ticket_id).scalar_subquery())
+    )
+
 class Attachment(db.Model):
     __tablename__ = 'attachments'
     id = db.Column(db.Integer, primary_key=True)
     ticket_id = db.Column(db.Integer, db.ForeignKey('tickets.id'), nullable=False)
     filename = db.Column(db.String(255), nullable=False)
+    # Content hash and size; identical files share one stored blob (NULL for legacy uploads)
+    sha256 = db.Column(db.String(64), nullable=True)
+    size = db.Column(db.BigInteger, nullable=True)
+    content_type = db.Column(db.String(100), nullable=True)
     uploaded_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        db.Index('idx_attachments_ticket_id', 'ticket_id'),
+        # download_attachment looks attachments up by file name
+        db.Index('idx_attachments_filename', 'filename'),
+        db.Index('idx_attachments_sha256', 'sha256'),
+    )
+
 
+class TicketDailyStat(db.Model):
+    """Per-day ticket activity by category, priority and status (maintained by utils.rollups)"""
+    __tablename__ = 'ticket_daily_stats'
+    
+    day = db.Column(db.Date, primary_key=True)  # IST calendar day
+    category = db.Column(db.String(50), primary_key=True)
+    priority = db.Column(db.String(20), primary_key=True)
+    status = db.Column(db.String(20), primary_key=True)
+    
+    created = db.Column(db.Integer, nullable=False, default=0)  # tickets opened (status row 'Open')
+    entered = db.Column(db.Integer, nullable=False, default=0)  # tickets moved into this status
+    exited = db.Column(db.Integer, nullable=False, default=0)   # tickets moved out of this status
+    
+    # Time to resolve for tickets entering 'Resolved': total plus a histogram for percentiles
+    resolve_seconds = db.Column(db.Float, nullable=False, default=0)
+    resolve_le_1h = db.Column(db.Integer, nullable=False, default=0)
+    resolve_le_4h = db.Column(db.Integer, nullable=False, default=0)
+    resolve_le_1d = db.Column(db.Integer, nullable=False, default=0)
+    resolve_le_3d = db.Column(db.Integer, nullable=False, default=0)
+    resolve_le_7d = db.Column(db.Integer, nullable=False, default=0)
+    resolve_le_30d = db.Column(db.Integer, nullable=False, default=0)
+    resolve_gt_30d = db.Column(db.Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f'<TicketDailyStat {self.day} {self.category}/{self.priority}/{self.status}>'
@@ -1,63 +1,115 @@
-from flask import render_template, request, redirect, url_for, flash, session, abort, make_response, send_file, send_from_directory
-from werkzeug.security import generate_password_hash
-from flask_login import current_user
+from flask import render_template, request, redirect, url_for, flash, session, abort, make_response, send_file, Response, stream_with_context
+from werkzeug.exceptions import HTTPException
 from werkzeug.utils import secure_filename
-from sqlalchemy import extract, and_
+from werkzeug.datastructures import MultiDict
+from sqlalchemy import extract, and_, false
 from app import app, db
 from models import User, Ticket, TicketComment, Attachment
-from forms import LoginForm, TicketForm, UpdateTicketForm, CommentForm, UserRegistrationForm, AssignTicketForm, UserProfileForm
-from datetime import datetime
-from utils.email import send_assignment_email  # Add this import
-from utils.timezone import utc_to_ist
+from forms import LoginForm, TicketForm, UpdateTicketForm, CommentForm, UserRegistrationForm, AssignTicketForm, UserProfileForm, BulkStatusForm, BulkAssignForm, UserImportForm
+from datetime import datetime, timedelta
+from utils.auth import get_current_user, get_identity, remember_identity, invalidate_identity, login_required, super_admin_required, current_user as current_user_proxy, client_ip, login_retry_after
+from utils.passwords import HashBusy, verify_password, needs_rehash
+from utils.email import send_assignment_email, send_bulk_assignment_email
+from utils.bulk import parse_ticket_ids, matching_ticket_ids, bulk_update_status, bulk_assign
+from utils.user_import import IMPORT_COLUMNS, read_csv, import_users
+from utils.events import subscribe, unsubscribe, catch_up, format_event, format_position, parse_position, notify_ticket_change
+from utils.timezone import period_bounds
+from utils.export import EXPORT_FORMATS, iter_ticket_rows, sample_rows, column_widths, stream_xlsx, stream_csv, stream_ndjson
+from utils.pagination import KeysetPage, keyset_paginate
+from utils.search import search_tickets, refresh_ticket_search
+from utils.rollups import get_trends, last_twelve_months
+from utils.storage import store_upload, send_upload, send_stored_file
+from utils.thumbnails import THUMBNAIL_SIZES, is_image, get_thumbnail, schedule_thumbnails, thumbnail_etag
+from utils.stats import get_ticket_stats, invalidate_ticket_stats, dashboard_counters, user_status_counts, report_counters, report_chart_data, STATUSES, CATEGORIES, PRIORITIES
+from utils.api import ticket_watermark, user_watermark, make_etag, conditional_json, page_to_dict, comment_to_dict
+from utils.comments import comment_page
+from utils.metrics import count_bytes
 import logging
-import os
-import socket
+import math
 import platform
-import openpyxl
-from openpyxl.styles import Font, PatternFill, Alignment
-import io
+import time
+import uuid
+from urllib.parse import parse_qsl
 
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'pdf', 'doc', 'docx', 'xls', 'xlsx', 'csv', 'ppt', 'pptx'}
-UPLOAD_FOLDER = 'uploads/'  # Set a secure uploads folder
 
 def allowed_file(filename):
     return '.' in filename and \
            filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
-# Helper function to check if user is logged in
-def is_logged_in():
-    return 'user_id' in session
-
-# Helper function to get current user
-def get_current_user():
-    if is_logged_in():
-        return User.query.get(session['user_id'])
-    return None
-
-# Helper function to require login
-def login_required(f):
-    def decorated_function(*args, **kwargs):
-        if not is_logged_in():
-            flash('Please log in to access this page.', 'warning')
-            return redirect(url_for('common_login'))
-        return f(*args, **kwargs)
-    decorated_function.__name__ = f.__name__
-    return decorated_function
-
-# Helper function to require super admin
-def super_admin_required(f):
-    def decorated_function(*args, **kwargs):
-        if not is_logged_in():
-            flash('Please log in to access this page.', 'warning')
-            return redirect(url_for('common_login'))
-        user = get_current_user()
-        if not user or not user.is_super_admin:
-            flash('Super Admin access required.', 'error')
-            return redirect(url_for('index'))
-        return f(*args, **kwargs)
-    decorated_function.__name__ = f.__name__
-    return decorated_function
+def filter_created_period(query, year=None, month=None, day=None):
+    """Filter tickets created in a calendar year/month/day using index-friendly ranges
+
+    A date that doesn't exist (month 13, 31 February, non-numeric) matches nothing.
+    """
+    try:
+        year = int(year) if year else None
+        month = int(month) if month else None
+        day = int(day) if day else None
+        if year and month and day:
+            start, end = period_bounds(year, month, day)
+        elif year and month:
+            start, end = period_bounds(year, month)
+        elif year:
+            start, end = period_bounds(year)
+        else:
+            start = end = None
+    except ValueError:
+        return query.filter(false())
+    if start:
+        query = query.filter(Ticket.created_at >= start, Ticket.created_at < end)
+    # A month or day without the enclosing year/month can't be expressed as one
+    # range; narrow within the year range (if any) instead
+    if month and not year:
+        query = query.filter(extract('month', Ticket.created_at) == month)
+    if day and not (year and month):
+        query = query.filter(extract('day', Ticket.created_at) == day)
+    return query
+
+def admin_ticket_query(args):
+    """All tickets narrowed by the admin dashboard's status/priority/category/date filters"""
+    query = Ticket.query
+    for field in ('status', 'priority', 'category'):
+        value = args.get(field, 'all')
+        if value != 'all':
+            query = query.filter(getattr(Ticket, field) == value)
+    return filter_created_period(query, args.get('year', ''), args.get('month', ''), args.get('day', ''))
+
+def user_ticket_query(user_id, args):
+    """One user's tickets narrowed by the user dashboard's status filter"""
+    query = Ticket.query.filter_by(user_id=user_id)
+    status_filter = args.get('status', 'all')
+    if status_filter != 'all':
+        query = query.filter_by(status=status_filter)
+    return query
+
+def bulk_ticket_ids(form):
+    """Tickets a bulk form applies to: the ticked ones, or all matching the posted dashboard filters"""
+    if form.select_all.data:
+        args = MultiDict(parse_qsl(form.filters.data or ''))
+        query = admin_ticket_query(args)
+        if args.get('search'):
+            query = search_tickets(query, args.get('search'))
+        ticket_ids = matching_ticket_ids(query)
+    else:
+        ticket_ids = parse_ticket_ids(form.ticket_ids.data)
+    if not ticket_ids:
+        raise ValueError('No tickets selected.')
+    return ticket_ids
+
+def paginated_tickets(query, search_query):
+    """Ranked top page for a search, otherwise a keyset page newest first"""
+    if search_query:
+        # Searches show the most relevant matches rather than a time-ordered page
+        return KeysetPage(search_tickets(query, search_query).limit(app.config['PAGE_SIZE']).all())
+    return keyset_paginate(query, Ticket, per_page=app.config['PAGE_SIZE'])
+
+
+@app.context_processor
+def inject_current_user():
+    """Expose the logged-in user to templates without loading it up front"""
+    return {'current_user': current_user_proxy}
 
 @app.route('/')
 def index():
@@ -67,29 +119,52 @@ def index():
 @app.route('/login', methods=['GET', 'POST'])
 def common_login():
     """Common login page for all user types"""
-    if is_logged_in():
-        user = get_current_user()
+    identity = get_identity()
+    if identity:
         # Redirect to appropriate dashboard based on role
-        if user.is_super_admin:
+        if identity.is_super_admin:
             return redirect(url_for('super_admin_dashboard'))
         else:
             return redirect(url_for('user_dashboard'))
     
     form = LoginForm()
     if form.validate_on_submit():
+        ip_address = client_ip()
+        retry_after = login_retry_after(form.username.data, ip_address)
+        if retry_after:
+            flash(f'Too many login attempts. Please try again in {math.ceil(retry_after)} seconds.', 'error')
+            response = make_response(render_template('common_login.html', form=form), 429)
+            response.headers['Retry-After'] = str(math.ceil(retry_after))
+            return response
+        
         user = User.query.filter_by(username=form.username.data).first()
-        if user and user.check_password(form.password.data):
-            # Set session variables
-            session['user_id'] = user.id
-            session['role'] = user.role
+        try:
+            valid = user is not None and verify_password(user.password_hash, form.password.data)
+        except HashBusy:
+            flash('Too many people are signing in right now. Please try again in a moment.', 'error')
+            response = make_response(render_template('common_login.html', form=form), 503)
+            response.headers['Retry-After'] = '5'
+            return response
+        
+        if valid:
+            # Only write when something changed; most logins are read-only
+            changed = False
+            if needs_rehash(user.password_hash):
+                # Upgrade hashes made with older cost parameters while the password is at hand
+                try:
+                    user.set_password(form.password.data)
+                    changed = True
+                except HashBusy:
+                    # The password is already verified; upgrade on a quieter login
+                    pass
+            if user.ip_address != ip_address:
+                user.ip_address = ip_address
+                changed = True
+            if changed:
+                db.session.commit()
             
-            # Update IP address and system info
-            user.ip_address = request.environ.get('HTTP_X_FORWARDED_FOR', request.environ.get('REMOTE_ADDR'))
-            try:
-                user.system_name = socket.gethostname()
-            except:
-                user.system_name = 'Unknown'
-            db.session.commit()
+            # Set session variables
+            remember_identity(user)
             
             flash(f'Welcome back, {user.first_name}!', 'success')
             
@@ -131,17 +206,13 @@ def user_dashboard():
     search_query = request.args.get('search', '')
     
     # Build query
-    query = Ticket.query.filter_by(user_id=user.id)
-    
-    if status_filter != 'all':
-        query = query.filter_by(status=status_filter)
+    query = user_ticket_query(user.id, request.args).options(*Ticket.listing_options())
+    tickets = paginated_tickets(query, search_query)
     
-    if search_query:
-        query = query.filter(Ticket.title.contains(search_query))
-    
-    tickets = query.order_by(Ticket.created_at.desc()).all()
+    # Per-status totals for the stat cards in one grouped query
+    status_counts = user_status_counts(user.id)
     
-    return render_template('user_dashboard.html', user=user, tickets=tickets, 
+    return render_template('user_dashboard.html', user=user, tickets=tickets, status_counts=status_counts,
                          status_filter=status_filter, search_query=search_query)
 
 @app.route('/user-profile', methods=['GET', 'POST'])
@@ -176,31 +247,8 @@ def user_profile():
 @super_admin_required
 def super_admin_dashboard():
     """Super Admin dashboard with full system overview and filters"""
-    user = get_current_user()
-    if not user.is_super_admin:
-        flash('Super Admin access required.', 'error')
-        return redirect(url_for('index'))
-
-    # Comprehensive statistics (unfiltered)
-    total_tickets = Ticket.query.count()
-    open_tickets = Ticket.query.filter_by(status='Open').count()
-    in_progress_tickets = Ticket.query.filter_by(status='In Progress').count()
-    resolved_tickets = Ticket.query.filter_by(status='Resolved').count()
-    total_users = User.query.filter_by(role='user').count()
-    total_admins = User.query.filter_by(role='admin').count()
-    hardware_tickets = Ticket.query.filter_by(category='Hardware').count()
-    software_tickets = Ticket.query.filter_by(category='Software').count()
-
-    stats = {
-        'total_tickets': total_tickets,
-        'open_tickets': open_tickets,
-        'in_progress_tickets': in_progress_tickets,
-        'resolved_tickets': resolved_tickets,
-        'total_users': total_users,
-        'total_admins': total_admins,
-        'hardware_tickets': hardware_tickets,
-        'software_tickets': software_tickets
-    }
+    # Comprehensive statistics (unfiltered), served from the shared stats cache
+    stats = dashboard_counters(get_ticket_stats())
 
     # Filter parameters for recent tickets
     status_filter = request.args.get('status', 'all')
@@ -212,28 +260,20 @@ def super_admin_dashboard():
     year_filter = request.args.get('year', '')
 
     # Build filtered query for recent tickets
-    query = Ticket.query
-    if status_filter != 'all':
-        query = query.filter_by(status=status_filter)
-    if priority_filter != 'all':
-        query = query.filter_by(priority=priority_filter)
-    if category_filter != 'all':
-        query = query.filter_by(category=category_filter)
+    query = admin_ticket_query(request.args)
     if search_query:
-        query = query.filter(Ticket.title.contains(search_query))
-    if year_filter:
-        query = query.filter(extract('year', Ticket.created_at) == int(year_filter))
-    if month_filter:
-        query = query.filter(extract('month', Ticket.created_at) == int(month_filter))
-    if day_filter:
-        query = query.filter(extract('day', Ticket.created_at) == int(day_filter))
+        query = search_tickets(query, search_query)
+    else:
+        query = query.order_by(Ticket.created_at.desc())
 
-    recent_tickets = query.order_by(Ticket.created_at.desc()).limit(10).all()
+    recent_tickets = query.options(*Ticket.listing_options()).limit(10).all()
 
     return render_template(
         'super_admin_dashboard.html',
         stats=stats,
         recent_tickets=recent_tickets,
+        bulk_status_form=BulkStatusForm(filters=request.query_string.decode()),
+        bulk_assign_form=BulkAssignForm(filters=request.query_string.decode()),
         status_filter=status_filter,
         priority_filter=priority_filter,
         category_filter=category_filter,
@@ -243,6 +283,116 @@ def super_admin_dashboard():
         year_filter=year_filter
     )
 
+@app.route('/events/tickets')
+@super_admin_required
+def ticket_events():
+    """Server-sent ticket changes and counters for open super admin dashboards
+
+    Every open stream holds a worker thread, so only the few super admins get
+    one (user dashboards poll the ETag API instead), and only while the tab is
+    visible. Each stream ends after SSE_STREAM_SECONDS; the browser reconnects
+    and is sent what changed in between.
+    """
+    identity = get_identity()
+    subscription = subscribe(identity.id, identity.is_super_admin)
+    position = parse_position(request.headers.get('Last-Event-ID') or request.args.get('last_event_id'))
+    if position:
+        catch_up(subscription, position)
+    keepalive = app.config['SSE_KEEPALIVE']
+    deadline = time.monotonic() + app.config['SSE_STREAM_SECONDS']
+    opened_at = datetime.utcnow()
+
+    def stream():
+        try:
+            yield f"retry: {app.config['SSE_RETRY_MS']}\n\n"
+            # Caught-up changes first, so the position only covers what was sent
+            while (event := subscription.next_event(0)) is not None:
+                yield format_event(*event)
+                if event[0] == 'resync':
+                    return
+            yield format_position(opened_at)
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    closed_at = datetime.utcnow()
+                    # Flush what is already queued, then hand over to the next stream
+                    while (event := subscription.next_event(0)) is not None:
+                        yield format_event(*event)
+                        if event[0] == 'resync':
+                            return
+                    yield format_position(closed_at)
+                    break
+                event = subscription.next_event(min(keepalive, remaining))
+                if event is None:
+                    # Comment line keeps proxies from closing an idle connection
+                    yield ': keepalive\n\n'
+                    continue
+                yield format_event(*event)
+                if event[0] == 'resync':
+                    break
+        finally:
+            unsubscribe(subscription)
+
+    return Response(stream(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+@app.route('/api/dashboard/admin')
+@super_admin_required
+def api_admin_dashboard():
+    """Stats and filtered tickets behind the super admin dashboard, as JSON"""
+    version = (ticket_watermark(), user_watermark())
+
+    def build():
+        query = admin_ticket_query(request.args).options(*Ticket.listing_options())
+        return {
+            'stats': dashboard_counters(get_ticket_stats(version)),
+            'tickets': page_to_dict(paginated_tickets(query, request.args.get('search', ''))),
+        }
+
+    return conditional_json(make_etag('admin', version), build)
+
+@app.route('/api/dashboard/user')
+@login_required
+def api_user_dashboard():
+    """The current user's ticket counts and tickets, as JSON"""
+    identity = get_identity()
+    version = ticket_watermark(Ticket.query.filter_by(user_id=identity.id))
+
+    def build():
+        status_counts = user_status_counts(identity.id)
+        query = user_ticket_query(identity.id, request.args).options(*Ticket.listing_options())
+        return {
+            'stats': {
+                'status': {status: status_counts.get(status, 0) for status in STATUSES},
+                'total_tickets': sum(status_counts.values()),
+            },
+            'tickets': page_to_dict(paginated_tickets(query, request.args.get('search', ''))),
+        }
+
+    return conditional_json(make_etag('user', identity.id, version), build)
+
+@app.route('/api/reports')
+@super_admin_required
+def api_reports():
+    """Report counters, chart series and the paginated ticket table, as JSON"""
+    version = (ticket_watermark(), user_watermark())
+
+    def build():
+        ticket_stats = get_ticket_stats(version)
+        page = keyset_paginate(Ticket.query.options(*Ticket.listing_options()), Ticket,
+                               per_page=app.config['PAGE_SIZE'])
+        return {
+            'stats': report_counters(ticket_stats),
+            'charts': {
+                'labels': {'category': CATEGORIES, 'priority': PRIORITIES, 'status': STATUSES},
+                'series': report_chart_data(ticket_stats),
+            },
+            'trends': get_trends(*last_twelve_months()),
+            'tickets': page_to_dict(page),
+        }
+
+    return conditional_json(make_etag('reports', version), build)
+
 
 
 
@@ -282,31 +432,31 @@ def create_ticket():
         user.ip_address = current_ip
         user.system_name = current_system_name
 
-        # Handle file uploads (supporting multiple attachments)
-        attachment_filenames = []
+        # Handle file uploads (supporting multiple attachments). Each file was
+        # streamed to disk and hashed while the request was parsed; identical
+        # content is stored once and shared between attachments.
+        uploads = []
         files = request.files.getlist('attachments')
         for file in files:
             if file and file.filename and allowed_file(file.filename):
                 filename = secure_filename(file.filename)
-                timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_')
-                unique_filename = timestamp + filename
-                os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-                filepath = os.path.join(UPLOAD_FOLDER, unique_filename)
+                unique_filename = f"{uuid.uuid4().hex[:12]}_{filename}"
                 try:
-                    file.save(filepath)
-                    attachment_filenames.append(unique_filename)
-                except Exception as e:
+                    sha256, size = store_upload(file)
+                    uploads.append((unique_filename, sha256, size, file.mimetype))
+                except OSError as e:
+                    logging.error(f"Error storing upload {filename}: {e}")
                     flash(f'Error uploading file {filename}.', 'warning')
 
-        # For backward compatibility, store the first image filename in image_filename, others in attachments
-        image_filename = None
+        # For backward compatibility, store the first image in image_filename, others in attachments
+        image_upload = None
         other_attachments = []
-        for fname in attachment_filenames:
-            if any(fname.lower().endswith(ext) for ext in
-                   ['.png', '.jpg', '.jpeg', '.gif', '.bmp']) and not image_filename:
-                image_filename = fname
+        for upload in uploads:
+            if any(upload[0].lower().endswith(ext) for ext in
+                   ['.png', '.jpg', '.jpeg', '.gif', '.bmp']) and not image_upload:
+                image_upload = upload
             else:
-                other_attachments.append(fname)
+                other_attachments.append(upload)
 
         # Create the ticket first
         ticket = Ticket(
@@ -318,21 +468,32 @@ def create_ticket():
             user_name=user.full_name,
             user_ip_address=current_ip,
             user_system_name=current_system_name,
-            image_filename=image_filename
+            image_filename=image_upload[0] if image_upload else None,
+            image_sha256=image_upload[1] if image_upload else None
         )
         db.session.add(ticket)
-        db.session.commit()
+        db.session.flush()
+        refresh_ticket_search(ticket.id)
 
-        # Create attachment records for non-image files
-        for attachment_filename in other_attachments:
+        # Attachment records for non-image files, in the same commit: a dashboard
+        # row cached between two commits would keep showing no attachments
+        for attachment_filename, sha256, size, content_type in other_attachments:
             attachment = Attachment(
                 ticket_id=ticket.id,
-                filename=attachment_filename
+                filename=attachment_filename,
+                sha256=sha256,
+                size=size,
+                content_type=content_type
             )
             db.session.add(attachment)
         
-        if other_attachments:
-            db.session.commit()
+        db.session.commit()
+        invalidate_ticket_stats()
+        notify_ticket_change()
+
+        # Previews are rendered in the background so admins don't download full-size images
+        for upload in uploads:
+            schedule_thumbnails(upload[0], upload[1])
 
         flash(f'Ticket {ticket.ticket_number} created successfully!', 'success')
         return redirect(url_for('user_dashboard'))
@@ -343,8 +504,8 @@ def create_ticket():
 @login_required
 def view_ticket(ticket_id):
     """View ticket details"""
-    ticket = Ticket.query.get_or_404(ticket_id)
-    user = get_current_user()
+    ticket = Ticket.query.options(*Ticket.detail_options()).filter_by(id=ticket_id).first_or_404()
+    user = get_identity()
     
     # Check if user can view this ticket
     if not user.is_super_admin and ticket.user_id != user.id:
@@ -352,16 +513,37 @@ def view_ticket(ticket_id):
     
     form = CommentForm()
     assign_form = AssignTicketForm() if user.is_super_admin else None
+    comments = comment_page(ticket.id)
     
     return render_template('view_ticket.html', ticket=ticket, form=form, 
-                         assign_form=assign_form, user=user)
+                         assign_form=assign_form, user=user, comments=comments)
+
+@app.route('/ticket/<int:ticket_id>/comments')
+@login_required
+def ticket_comments(ticket_id):
+    """Older comments for "load more": JSON, or rendered items with ?format=html"""
+    ticket = db.session.query(Ticket.user_id).filter(Ticket.id == ticket_id).first_or_404()
+    user = get_identity()
+    if not user.is_super_admin and ticket.user_id != user.id:
+        abort(403)
+    
+    comments = comment_page(ticket_id)
+    next_url = (url_for('ticket_comments', ticket_id=ticket_id, comments_next=comments.next_cursor,
+                        format=request.args.get('format'))
+                if comments.has_next else None)
+    if request.args.get('format') == 'html':
+        response = make_response(render_template('comment_items.html', comments=comments))
+        if next_url:
+            response.headers['X-Next-Page'] = next_url
+        return response
+    return {'comments': [comment_to_dict(comment) for comment in comments], 'next_url': next_url}
 
 @app.route('/ticket/<int:ticket_id>/comment', methods=['POST'])
 @login_required
 def add_comment(ticket_id):
     """Add comment to ticket"""
     ticket = Ticket.query.get_or_404(ticket_id)
-    user = get_current_user()
+    user = get_identity()
     
     # Check if user can comment on this ticket
     if not user.is_super_admin and ticket.user_id != user.id:
@@ -376,7 +558,10 @@ def add_comment(ticket_id):
         )
         db.session.add(comment)
         ticket.updated_at = datetime.utcnow()
+        db.session.flush()
+        refresh_ticket_search(ticket.id)
         db.session.commit()
+        notify_ticket_change()
         
         flash('Comment added successfully!', 'success')
     
@@ -421,7 +606,12 @@ def edit_ticket(ticket_id):
             )
             db.session.add(comment)
         
+        db.session.flush()
+        refresh_ticket_search(ticket.id)
         db.session.commit()
+        notify_ticket_change()
+        if old_status != ticket.status:
+            invalidate_ticket_stats()
         
         flash('Ticket status updated successfully!', 'success')
         return redirect(url_for('view_ticket', ticket_id=ticket_id))
@@ -437,7 +627,7 @@ def assign_ticket(ticket_id):
     form = AssignTicketForm()
 
     if form.validate_on_submit():
-        current_user = get_current_user()
+        current_user = get_identity()
         ticket.assigned_to = form.assigned_to.data
         ticket.assigned_by = current_user.id if current_user else None
         if ticket.status == 'Open':
@@ -445,10 +635,12 @@ def assign_ticket(ticket_id):
         ticket.updated_at = datetime.utcnow()
         ticket.assigned_at = datetime.utcnow()
         db.session.commit()
+        invalidate_ticket_stats()
+        notify_ticket_change()
 
         assignee = User.query.get(form.assigned_to.data)
 
-        # Send email notification
+        # Queue email notification; delivery happens in the background
         if assignee and assignee.email:
             send_assignment_email(assignee.email, ticket.id, assignee.full_name)
 
@@ -457,15 +649,70 @@ def assign_ticket(ticket_id):
     return redirect(url_for('view_ticket', ticket_id=ticket_id))
 
 
+@app.route('/tickets/bulk-status', methods=['POST'])
+@super_admin_required
+def bulk_status_update():
+    """Change the status of many tickets at once (Super Admin only)"""
+    form = BulkStatusForm()
+    if not form.validate_on_submit():
+        flash('Select at least one ticket and a status.', 'error')
+        return redirect(request.referrer or url_for('super_admin_dashboard'))
+    
+    try:
+        ticket_ids = bulk_ticket_ids(form)
+        changed = bulk_update_status(ticket_ids, form.status.data, get_identity().id, (form.comment.data or '').strip())
+    except ValueError as e:
+        flash(str(e), 'error')
+        return redirect(request.referrer or url_for('super_admin_dashboard'))
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"Error in bulk status update: {e}")
+        flash('Error updating tickets. No changes were made.', 'error')
+        return redirect(request.referrer or url_for('super_admin_dashboard'))
+    
+    if changed:
+        invalidate_ticket_stats()
+        notify_ticket_change()
+    flash(f"{changed} of {len(ticket_ids)} tickets updated to '{form.status.data}'.", 'success')
+    return redirect(request.referrer or url_for('super_admin_dashboard'))
+
+
+@app.route('/tickets/bulk-assign', methods=['POST'])
+@super_admin_required
+def bulk_assign_tickets():
+    """Assign many tickets at once (Super Admin only)"""
+    form = BulkAssignForm()
+    if not form.validate_on_submit():
+        flash('Select at least one ticket and an assignee.', 'error')
+        return redirect(request.referrer or url_for('super_admin_dashboard'))
+    
+    try:
+        ticket_ids = bulk_ticket_ids(form)
+        changed = bulk_assign(ticket_ids, form.assigned_to.data, get_identity().id, (form.comment.data or '').strip())
+    except ValueError as e:
+        flash(str(e), 'error')
+        return redirect(request.referrer or url_for('super_admin_dashboard'))
+    except Exception as e:
+        db.session.rollback()
+        logging.error(f"Error in bulk assignment: {e}")
+        flash('Error assigning tickets. No changes were made.', 'error')
+        return redirect(request.referrer or url_for('super_admin_dashboard'))
+    
+    if changed:
+        invalidate_ticket_stats()
+        notify_ticket_change()
+        assignee = User.query.get(form.assigned_to.data)
+        # One summary email instead of one per ticket
+        if assignee and assignee.email:
+            send_bulk_assignment_email(assignee.email, changed, assignee.full_name)
+    flash(f'{changed} tickets assigned.', 'success')
+    return redirect(request.referrer or url_for('super_admin_dashboard'))
+
+
 @app.route('/edit-user/<int:user_id>', methods=['GET', 'POST'])
 @super_admin_required
 def edit_user(user_id):
     """Edit user (Super Admin only)"""
-    current_user = get_current_user()
-    if not current_user.is_super_admin:
-        flash('Super Admin access required.', 'error')
-        return redirect(url_for('index'))
-
     user = User.query.get_or_404(user_id)
     form = UserProfileForm()
 
@@ -479,8 +726,10 @@ def edit_user(user_id):
         user.system_name = form.system_name.data
         # Only update password if a new value is provided
         if form.password.data:
-            user.password = generate_password_hash(form.password.data)
+            user.set_password(form.password.data)
         db.session.commit()
+        invalidate_identity(user.id)
+        invalidate_ticket_stats()
         flash(f'User {user.username} updated successfully!', 'success')
         return redirect(url_for('view_user', user_id=user_id))
 
@@ -500,23 +749,14 @@ def edit_user(user_id):
 @super_admin_required
 def manage_users():
     """Super Admin user management"""
-    user = get_current_user()
-    if not user.is_super_admin:
-        flash('Super Admin access required.', 'error')
-        return redirect(url_for('index'))
-    
-    users = User.query.all()
-    return render_template('manage_users.html', users=users)
+    users = keyset_paginate(User.query, User, per_page=app.config['PAGE_SIZE'])
+    role_counts = get_ticket_stats()['roles']
+    return render_template('manage_users.html', users=users, role_counts=role_counts)
 
 @app.route('/create-user', methods=['GET', 'POST'])
 @super_admin_required
 def create_user():
     """Create new user (Super Admin only)"""
-    user = get_current_user()
-    if not user.is_super_admin:
-        flash('Super Admin access required.', 'error')
-        return redirect(url_for('index'))
-    
     form = UserRegistrationForm()
     if form.validate_on_submit():
         new_user = User(
@@ -530,25 +770,56 @@ def create_user():
         new_user.set_password(form.password.data)
         db.session.add(new_user)
         db.session.commit()
+        invalidate_ticket_stats()
         
         flash(f'User {new_user.username} created successfully!', 'success')
         return redirect(url_for('manage_users'))
     
     return render_template('create_user.html', form=form)
 
+@app.route('/import-users', methods=['GET', 'POST'])
+@super_admin_required
+def import_users_view():
+    """Create many users from an uploaded CSV file (Super Admin only)"""
+    form = UserImportForm()
+    result = None
+    if form.validate_on_submit():
+        max_rows = app.config['USER_IMPORT_MAX_ROWS']
+        try:
+            text = form.csv_file.data.read().decode('utf-8-sig')
+            rows = list(read_csv(text))
+        except (UnicodeDecodeError, ValueError) as e:
+            flash(f'Could not read the CSV file: {e}', 'error')
+        else:
+            if len(rows) > max_rows:
+                # Hashing a large file would outlast the worker timeout
+                flash(f'The file has {len(rows)} rows; at most {max_rows} can be imported here. '
+                      f'Split it, or run "flask import-users <file>" on the server.', 'error')
+            else:
+                try:
+                    result = import_users(rows)
+                except Exception as e:
+                    logging.error(f"Error importing users: {e}")
+                    flash('Error importing users. No users were created.', 'error')
+                else:
+                    if result.created:
+                        invalidate_ticket_stats()
+                    flash(f'{result.created} users created, {len(result.errors)} rows rejected.',
+                          'success' if not result.errors else 'warning')
+    
+    return render_template('import_users.html', form=form, result=result, columns=IMPORT_COLUMNS,
+                           max_rows=app.config['USER_IMPORT_MAX_ROWS'])
+
 @app.route('/view-user/<int:user_id>')
 @super_admin_required
 def view_user(user_id):
     """View user details (Super Admin only)"""
-    current_user = get_current_user()
-    if not current_user.is_super_admin:
-        flash('Super Admin access required.', 'error')
-        return redirect(url_for('index'))
-    
     user = User.query.get_or_404(user_id)
     # Get user's tickets
-    user_tickets = Ticket.query.filter_by(user_id=user_id).order_by(Ticket.created_at.desc()).all()
-    assigned_tickets = Ticket.query.filter_by(assigned_to=user_id).order_by(Ticket.created_at.desc()).all()
+    user_tickets = keyset_paginate(Ticket.query.filter_by(user_id=user_id), Ticket,
+                                   per_page=10, param='tickets')
+    assigned_tickets = keyset_paginate(Ticket.query.filter_by(assigned_to=user_id), Ticket,
+                                       per_page=10, param='assigned')
     
     return render_template('view_user.html', user=user, user_tickets=user_tickets, assigned_tickets=assigned_tickets)
 
@@ -558,10 +829,7 @@ def view_user(user_id):
 @super_admin_required
 def delete_user(user_id):
     """Delete user (Super Admin only)"""
-    current_user = get_current_user()
-    if not current_user.is_super_admin:
-        flash('Super Admin access required.', 'error')
-        return redirect(url_for('index'))
+    current_user = get_identity()
     
     user_to_delete = User.query.get_or_404(user_id)
     
@@ -598,7 +866,12 @@ def delete_user(user_id):
         # Delete the user
         username = user_to_delete.username
         db.session.delete(user_to_delete)
+        db.session.flush()
+        refresh_ticket_search(*{comment.ticket_id for comment in comments})
         db.session.commit()
+        invalidate_ticket_stats()
+        notify_ticket_change()
+        invalidate_identity(user_id)
         
         flash(f'User "{username}" has been successfully deleted. Their tickets have been preserved and reassigned tickets are now available for assignment.', 'success')
         
@@ -612,10 +885,7 @@ def delete_user(user_id):
 @super_admin_required
 def assign_work(ticket_id):
     """Super Admin assigns work to specific admins based on category"""
-    user = get_current_user()
-    if not user.is_super_admin:
-        flash('Super Admin access required.', 'error')
-        return redirect(url_for('index'))
+    user = get_identity()
     
     ticket = Ticket.query.get_or_404(ticket_id)
     
@@ -631,6 +901,8 @@ def assign_work(ticket_id):
         ticket.status = 'In Progress'
         ticket.updated_at = datetime.utcnow()
         db.session.commit()
+        invalidate_ticket_stats()
+        notify_ticket_change()
         
         assignee = User.query.get(form.assigned_to.data)
         flash(f'Work assigned to {assignee.full_name}!', 'success')
@@ -638,107 +910,31 @@ def assign_work(ticket_id):
     
     return render_template('assign_work.html', form=form, ticket=ticket, admins=admins)
 
-def create_default_admin():
-    """Create default super admin and test user if none exists"""
-    try:
-        super_admin = User.query.filter_by(role='super_admin').first()
-        if not super_admin:
-            # Create Super Admin
-            super_admin_user = User(
-                username='superadmin',
-                email='superadmin@gtnengineering.com',
-                first_name='Super',
-                last_name='Administrator',
-                department='IT',
-                role='super_admin'
-            )
-            super_admin_user.set_password('super123')
-            db.session.add(super_admin_user)
-            db.session.commit()
-            
-            # Create a test user
-            test_user = User(
-                username='testuser',
-                email='user@gtnengineering.com',
-                first_name='Test',
-                last_name='User',
-                department='Engineering',
-                role='user'
-            )
-            test_user.set_password('test123')
-            db.session.add(test_user)
-            db.session.commit()
-            
-            logging.info("Default super admin and test user created")
-    except Exception as e:
-        logging.error(f"Error creating default users: {e}")
-        db.session.rollback()
-
 @app.route('/reports-dashboard')
 @super_admin_required
 def reports_dashboard():
     """Reports Dashboard with visual analytics (Super Admin only)"""
-    current_user = get_current_user()
-    if not current_user.is_super_admin:
-        flash('Super Admin access required.', 'error')
-        return redirect(url_for('index'))
-    
-    # Get comprehensive statistics
-    total_tickets = Ticket.query.count()
-    open_tickets = Ticket.query.filter_by(status='Open').count()
-    in_progress_tickets = Ticket.query.filter_by(status='In Progress').count()
-    resolved_tickets = Ticket.query.filter_by(status='Resolved').count()
-    closed_tickets = Ticket.query.filter_by(status='Closed').count()
-    
-    # Category breakdown
-    hardware_tickets = Ticket.query.filter_by(category='Hardware').count()
-    software_tickets = Ticket.query.filter_by(category='Software').count()
-    network_tickets = Ticket.query.filter_by(category='Network').count()
-    other_tickets = Ticket.query.filter_by(category='Other').count()
-    
-    # Priority breakdown  
-    critical_tickets = Ticket.query.filter_by(priority='Critical').count()
-    high_tickets = Ticket.query.filter_by(priority='High').count()
-    medium_tickets = Ticket.query.filter_by(priority='Medium').count()
-    low_tickets = Ticket.query.filter_by(priority='Low').count()
+    # Get comprehensive statistics from the shared stats cache
+    ticket_stats = get_ticket_stats()
     
     # Get all tickets for detailed table
-    all_tickets = Ticket.query.order_by(Ticket.created_at.desc()).all()
-    
-    stats = {
-        'total_tickets': total_tickets,
-        'open_tickets': open_tickets,
-        'in_progress_tickets': in_progress_tickets,
-        'resolved_tickets': resolved_tickets,
-        'closed_tickets': closed_tickets,
-        'hardware_tickets': hardware_tickets,
-        'software_tickets': software_tickets,
-        'network_tickets': network_tickets,
-        'other_tickets': other_tickets,
-        'critical_tickets': critical_tickets,
-        'high_tickets': high_tickets,
-        'medium_tickets': medium_tickets,
-        'low_tickets': low_tickets
-    }
+    all_tickets = keyset_paginate(Ticket.query.options(*Ticket.report_options()), Ticket,
+                                  per_page=app.config['PAGE_SIZE'])
+    
+    stats = report_counters(ticket_stats)
     
     # Prepare chart data for JavaScript
-    chart_data = {
-        'category': [hardware_tickets, software_tickets, network_tickets, other_tickets],
-        'priority': [critical_tickets, high_tickets, medium_tickets, low_tickets],
-        'status': [open_tickets, in_progress_tickets, resolved_tickets, closed_tickets]
-    }
+    chart_data = report_chart_data(ticket_stats)
+    
+    # 12-month trends from the pre-aggregated daily rollups
+    trends = get_trends(*last_twelve_months())
     
-    return render_template('reports_dashboard.html', stats=stats, tickets=all_tickets, chart_data=chart_data)
+    return render_template('reports_dashboard.html', stats=stats, tickets=all_tickets, chart_data=chart_data, trends=trends)
 
 @app.route('/edit-assignment/<int:ticket_id>', methods=['GET', 'POST'])
 @super_admin_required
 def edit_assignment(ticket_id):
     """Edit ticket assignment (Super Admin only)"""
-    current_user = get_current_user()
-    if not current_user.is_super_admin:
-        flash('Super Admin access required.', 'error')
-        return redirect(url_for('index'))
-    
     ticket = Ticket.query.get_or_404(ticket_id)
     
     if request.method == 'POST':
@@ -753,6 +949,8 @@ def edit_assignment(ticket_id):
         
         try:
             db.session.commit()
+            invalidate_ticket_stats()
+            notify_ticket_change()
             assignee_name = User.query.get(assigned_to).full_name if assigned_to else 'Unassigned'
             flash(f'Ticket {ticket.ticket_number} has been assigned to {assignee_name}.', 'success')
             return redirect(url_for('super_admin_dashboard'))
@@ -770,10 +968,11 @@ def edit_assignment(ticket_id):
 @login_required
 def view_image(filename):
     """View uploaded ticket image - admins can view any, users can view their own"""
-    current_user = get_current_user()
+    current_user = get_identity()
     
-    # Find ticket with this image
-    ticket = Ticket.query.filter_by(image_filename=filename).first()
+    # Find ticket with this image (indexed on image_filename; only the columns needed)
+    ticket = (db.session.query(Ticket.user_id, Ticket.image_sha256)
+              .filter(Ticket.image_filename == filename).first())
     if not ticket:
         abort(404)
     
@@ -781,42 +980,65 @@ def view_image(filename):
     if not current_user.is_super_admin and ticket.user_id != current_user.id:
         abort(403)
     
-    try:
-        return send_from_directory('uploads', filename)
-    except FileNotFoundError:
+    return send_upload(filename, ticket.image_sha256)
+
+@app.route('/thumbnail/<size>/<filename>')
+@login_required
+def view_thumbnail(size, filename):
+    """Small preview of an uploaded image, with the same permissions as the image itself"""
+    current_user = get_identity()
+    if size not in THUMBNAIL_SIZES or not is_image(filename):
         abort(404)
+    
+    # The primary ticket image, or an image attachment
+    upload = (db.session.query(Ticket.image_sha256.label('sha256'), Ticket.user_id)
+              .filter(Ticket.image_filename == filename).first())
+    if not upload:
+        upload = (db.session.query(Attachment.sha256, Ticket.user_id)
+                  .outerjoin(Ticket, Ticket.id == Attachment.ticket_id)
+                  .filter(Attachment.filename == filename).first())
+    if not upload:
+        abort(404)
+    
+    if not current_user.is_super_admin and upload.user_id != current_user.id:
+        abort(403)
+    
+    path = get_thumbnail(filename, upload.sha256, size)
+    if path is None:
+        # Preview still rendering, or not an image Pillow can read: send the
+        # original for now, and have the browser ask again next time
+        response = send_upload(filename, upload.sha256)
+        response.cache_control.max_age = None
+        response.cache_control.immutable = False
+        response.cache_control.no_cache = True
+        return response
+    return send_stored_file(path, thumbnail_etag(filename, upload.sha256, size))
 
 @app.route('/download-attachment/<filename>')
 @login_required
 def download_attachment(filename):
     """Download file attachment - admins can download any, users can download their own"""
-    current_user = get_current_user()
+    current_user = get_identity()
     
-    # Find the attachment record
-    attachment = Attachment.query.filter_by(filename=filename).first()
+    # Find the attachment and its ticket's owner in one indexed lookup
+    attachment = (db.session.query(Attachment.sha256, Ticket.user_id)
+                  .outerjoin(Ticket, Ticket.id == Attachment.ticket_id)
+                  .filter(Attachment.filename == filename).first())
     if not attachment:
         abort(404)
     
     # Check permissions - admins can download any, users only their own tickets
-    if not current_user.is_super_admin:
-        ticket = Ticket.query.get(attachment.ticket_id)
-        if not ticket or ticket.user_id != current_user.id:
-            abort(403)
+    if not current_user.is_super_admin and attachment.user_id != current_user.id:
+        abort(403)
     
-    try:
-        return send_from_directory('uploads', filename, as_attachment=True)
-    except FileNotFoundError:
-        abort(404)
+    # Stored names are "<token>_<original name>"; offer the original name
+    download_name = filename.split('_', 1)[-1] if attachment.sha256 else filename
+    return send_upload(filename, attachment.sha256, download_name=download_name, as_attachment=True)
 
 @app.route('/download-excel-report')
 @super_admin_required
 def download_excel_report():
     """Download Excel report of all tickets (Super Admin only) with filtering options"""
-    current_user = get_current_user()
-    if not current_user.is_super_admin:
-        flash('Super Admin access required.', 'error')
-        return redirect(url_for('index'))
-
     try:
         # --- FILTER PARAMS ---
         filter_mode = request.args.get('filter_mode', 'range')
@@ -830,102 +1052,48 @@ def download_excel_report():
 
         if filter_mode == 'range' and from_date and to_date:
             from_dt = datetime.strptime(from_date, '%Y-%m-%d')
-            to_dt = datetime.strptime(to_date, '%Y-%m-%d')
-            query = query.filter(Ticket.created_at >= from_dt, Ticket.created_at <= to_dt)
+            # Half-open range so the whole "to" day is included
+            to_dt = datetime.strptime(to_date, '%Y-%m-%d') + timedelta(days=1)
+            query = query.filter(Ticket.created_at >= from_dt, Ticket.created_at < to_dt)
         elif filter_mode == 'month' and month:
-            y, m = map(int, month.split('-'))
-            query = query.filter(
-                extract('year', Ticket.created_at) == y,
-                extract('month', Ticket.created_at) == m
-            )
+            y, _, m = month.partition('-')
+            query = filter_created_period(query, y, m)
         elif filter_mode == 'year' and year:
-            query = query.filter(extract('year', Ticket.created_at) == int(year))
-
-        tickets = query.all()
-
-        # --- EXCEL GENERATION ---
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Tickets Report"
-        headers = [
-            'Ticket ID', 'Title', 'Description', 'Category', 'Priority', 'Status',
-            'Created By', 'User Email', 'User Department', 'System Name', 'IP Address',
-            'Assigned To', 'Assigned By', 'Created Date', 'Updated Date', 'Resolved Date'
-        ]
-        header_font = Font(bold=True, color="FFFFFF")
-        header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-        header_alignment = Alignment(horizontal="center", vertical="center")
-
-        # Add headers to worksheet
-        for col, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = header_alignment
-
-        # Add ticket data
-        for row, ticket in enumerate(tickets, 2):
-            assignee_name = ticket.assignee.full_name if hasattr(ticket, 'assignee') and ticket.assignee else 'Unassigned'
-            assigner_name = ticket.assigner.full_name if hasattr(ticket, 'assigner') and ticket.assigner else 'N/A'
-            data = [
-                ticket.ticket_number,
-                ticket.title,
-                ticket.description,
-                ticket.category,
-                ticket.priority,
-                ticket.status,
-                getattr(ticket, 'user_name', ticket.user.full_name if hasattr(ticket.user, 'full_name') else 'N/A'),
-                ticket.user.email,
-                getattr(ticket.user, 'department', 'N/A') or 'N/A',
-                getattr(ticket, 'user_system_name', 'N/A') or 'N/A',
-                getattr(ticket, 'user_ip_address', 'N/A') or 'N/A',
-                assignee_name,
-                assigner_name,
-                utc_to_ist(ticket.created_at).strftime('%Y-%m-%d %H:%M:%S') if ticket.created_at else 'N/A',
-                utc_to_ist(ticket.updated_at).strftime('%Y-%m-%d %H:%M:%S') if ticket.updated_at else 'N/A',
-                utc_to_ist(ticket.resolved_at).strftime('%Y-%m-%d %H:%M:%S') if ticket.resolved_at else 'N/A'
-            ]
-            for col, value in enumerate(data, 1):
-                ws.cell(row=row, column=col, value=value)
-
-        # Auto-adjust column widths
-        for column in ws.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            for cell in column:
-                try:
-                    if cell.value and len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            adjusted_width = min(max_length + 2, 50)
-            ws.column_dimensions[column_letter].width = adjusted_width
-
-        # Save to memory
-        output = io.BytesIO()
-        wb.save(output)
-        output.seek(0)
+            query = filter_created_period(query, year)
+
+        # --- STREAMED EXPORT ---
+        export_format = request.args.get('format', 'xlsx')
+        if export_format not in EXPORT_FORMATS:
+            abort(400)
+
+        # Pull the first chunk up front so query errors still redirect instead
+        # of breaking an already-started download
+        sample, rows = sample_rows(iter_ticket_rows(query.options(*Ticket.export_options()).order_by(Ticket.id)))
+        if export_format == 'xlsx':
+            body = stream_xlsx(rows, column_widths(sample))
+        elif export_format == 'csv':
+            body = stream_csv(rows)
+        else:
+            body = stream_ndjson(rows)
 
         # Generate filename with timestamp
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f'GTN_Helpdesk_Report_{timestamp}.xlsx'
+        filename = f'GTN_Helpdesk_Report_{timestamp}.{export_format}'
 
-        # Create response
-        response = make_response(output.getvalue())
-        response.headers['Content-Type'] = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        # Chunked response; rows are fetched and written as the client reads
+        body = count_bytes(body, 'export_bytes_total', format=export_format)
+        response = Response(stream_with_context(body), mimetype=EXPORT_FORMATS[export_format])
         response.headers['Content-Disposition'] = f'attachment; filename={filename}'
 
         return response
 
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Error generating Excel report: {e}")
         flash('Error generating report. Please try again.', 'error')
         return redirect(url_for('reports_dashboard'))
 
-# Initialize default admin on first import
-with app.app_context():
-    create_default_admin()
-
 # Error handlers
 @app.errorhandler(404)
 def not_found_error(error):
@@ -935,6 +1103,12 @@ def not_found_error(error):
 def forbidden_error(error):
     return render_template('403.html'), 403
 
+@app.errorhandler(HashBusy)
+def hash_busy_error(error):
+    # Password changes outside login queue on the same limit as sign-ins
+    db.session.rollback()
+    return 'Too many password operations are running. Please try again in a moment.', 503, {'Retry-After': '5'}
+
 @app.errorhandler(500)
 def internal_error(error):
     db.session.rollback()
@@ -135,36 +135,193 @@ function initializeSearch() {
 }
 
 /**
- * Initialize auto-refresh for dashboards
+ * Live dashboard updates over Server-Sent Events
  */
+const STATUS_BADGES = {
+    'Open': {'class': 'status-open', 'icon': 'ri-error-warning-line'},
+    'In Progress': {'class': 'status-progress', 'icon': 'ri-time-line'},
+    'Resolved': {'class': 'status-resolved', 'icon': 'ri-check-line'},
+    'Closed': {'class': 'status-closed', 'icon': 'ri-check-double-line'}
+};
+
 function initializeAutoRefresh() {
-    // Auto-refresh dashboard every 30 seconds if on dashboard page
-    if (window.location.pathname.includes('dashboard')) {
-        let refreshInterval = setInterval(function() {
-            // Only refresh if user is still active (not idle)
-            if (document.hasFocus()) {
-                const currentTime = new Date().getTime();
-                const lastActivity = localStorage.getItem('lastActivity') || currentTime;
-                
-                // Refresh if user was active in the last 5 minutes
-                if (currentTime - lastActivity < 300000) {
-                    refreshDashboard();
+    // Super admin dashboards stream changes (data-live-updates="<event stream url>");
+    // user dashboards poll their JSON API (data-poll-url) now and then
+    const dashboard = document.querySelector('[data-live-updates], [data-poll-url]');
+    if (!dashboard) {
+        return;
+    }
+    if (dashboard.dataset.liveUpdates && window.EventSource) {
+        initializeLiveUpdates(dashboard);
+    } else if (dashboard.dataset.pollUrl) {
+        initializePolling(dashboard);
+    }
+}
+
+/**
+ * Apply a batch of changed tickets and counters to the dashboard
+ */
+function applyTicketChanges(tickets, stats) {
+    const newTickets = [];
+    tickets.forEach(function(ticket) {
+        const card = document.querySelector(`[data-ticket-id="${ticket.id}"]`);
+        if (card) {
+            patchTicketCard(card, ticket);
+        } else if (ticket.is_new) {
+            newTickets.push(ticket.ticket_number);
+        }
+    });
+    updateStatCards(stats || {});
+    if (newTickets.length) {
+        showNotification(`New ticket${newTickets.length > 1 ? 's' : ''}: #${newTickets.join(', #')}`, 'info');
+    }
+}
+
+function initializeLiveUpdates(dashboard) {
+    let source = null;
+    let position = null;  // where the last stream got to, for catching up after a pause
+
+    function open() {
+        if (source) {
+            return;
+        }
+        const url = new URL(dashboard.dataset.liveUpdates, window.location.href);
+        if (position) {
+            url.searchParams.set('last_event_id', position);
+        }
+        source = new EventSource(url);
+        source.addEventListener('tickets', function(event) {
+            const data = JSON.parse(event.data);
+            applyTicketChanges(data.tickets, data.stats);
+        });
+        source.addEventListener('position', function(event) {
+            position = event.lastEventId;
+        });
+        // The server dropped updates for this tab; a reload is the only safe catch-up
+        source.addEventListener('resync', function() {
+            close();
+            location.reload();
+        });
+    }
+
+    function close() {
+        if (source) {
+            source.close();
+            source = null;
+        }
+    }
+
+    // A hidden tab doesn't hold a connection; it catches up when shown again
+    document.addEventListener('visibilitychange', function() {
+        if (document.hidden) {
+            close();
+        } else {
+            open();
+        }
+    });
+    window.addEventListener('beforeunload', close);
+    if (!document.hidden) {
+        open();
+    }
+}
+
+function initializePolling(dashboard) {
+    const interval = (parseInt(dashboard.dataset.pollInterval, 10) || 60) * 1000;
+    let etag = null;
+
+    function poll() {
+        if (document.hidden) {
+            return;
+        }
+        // The ETag makes an unchanged dashboard a bodiless 304
+        fetch(dashboard.dataset.pollUrl, {
+            credentials: 'same-origin',
+            cache: 'no-store',
+            headers: etag ? {'If-None-Match': etag} : {}
+        })
+            .then(function(response) {
+                if (!response.ok) {
+                    return null;
                 }
-            }
-        }, 30000);
-        
-        // Track user activity
-        ['mousedown', 'mousemove', 'keypress', 'scroll', 'touchstart'].forEach(function(event) {
-            document.addEventListener(event, function() {
-                localStorage.setItem('lastActivity', new Date().getTime());
-            });
+                etag = response.headers.get('ETag');
+                return response.json();
+            })
+            .then(function(data) {
+                if (!data) {
+                    return;
+                }
+                const changed = data.tickets.items.filter(function(ticket) {
+                    const card = document.querySelector(`[data-ticket-id="${ticket.id}"]`);
+                    return card && ticketCardDiffers(card, ticket);
+                });
+                const status = data.stats.status || {};
+                applyTicketChanges(changed, {
+                    open_tickets: status['Open'] || 0,
+                    in_progress_tickets: status['In Progress'] || 0,
+                    resolved_tickets: status['Resolved'] || 0,
+                    total_tickets: data.stats.total_tickets
+                });
+            })
+            .catch(function() {});
+    }
+
+    setInterval(poll, interval);
+    document.addEventListener('visibilitychange', poll);
+}
+
+/**
+ * Whether a ticket card shows a different status or priority than the ticket
+ */
+function ticketCardDiffers(card, ticket) {
+    const status = card.querySelector('[data-ticket-field="status"]');
+    const priority = card.querySelector('[data-ticket-field="priority"]');
+    return (status && status.textContent.trim() !== ticket.status) ||
+        (priority && priority.textContent.trim() !== ticket.priority);
+}
+
+/**
+ * Update one ticket card in place from a change event
+ */
+function patchTicketCard(card, ticket) {
+    const status = card.querySelector('[data-ticket-field="status"]');
+    if (status && STATUS_BADGES[ticket.status]) {
+        Object.values(STATUS_BADGES).forEach(function(config) {
+            status.classList.remove(config.class);
         });
-        
-        // Clear interval when page is unloaded
-        window.addEventListener('beforeunload', function() {
-            clearInterval(refreshInterval);
+        status.classList.add(STATUS_BADGES[ticket.status].class);
+        status.innerHTML = `<i class="${STATUS_BADGES[ticket.status].icon}"></i> `;
+        status.appendChild(document.createTextNode(ticket.status));
+    }
+
+    const priority = card.querySelector('[data-ticket-field="priority"]');
+    if (priority) {
+        ['low', 'medium', 'high', 'critical'].forEach(function(level) {
+            priority.classList.remove(`priority-${level}`);
         });
+        priority.classList.add(`priority-${ticket.priority.toLowerCase()}`);
+        priority.textContent = ticket.priority;
     }
+
+    const assignee = card.querySelector('[data-ticket-field="assignee"]');
+    if (assignee && ticket.assignee) {
+        assignee.textContent = ticket.assignee;
+    }
+
+    card.classList.add('ticket-updated');
+    setTimeout(function() {
+        card.classList.remove('ticket-updated');
+    }, 2000);
+}
+
+/**
+ * Update the counters on the stat cards
+ */
+function updateStatCards(stats) {
+    Object.keys(stats).forEach(function(key) {
+        document.querySelectorAll(`[data-stat="${key}"]`).forEach(function(element) {
+            element.textContent = stats[key];
+        });
+    });
 }
 
 /**
@@ -0,0 +1,101 @@
+import hashlib
+from flask import Response, jsonify, request
+from sqlalchemy import func
+from app import db
+from models import User, Ticket
+
+
+def _isoformat(dt):
+    return dt.isoformat() if dt else None
+
+
+def ticket_to_dict(ticket):
+    """JSON representation of a ticket for the dashboard API (load with listing_options)"""
+    return {
+        'id': ticket.id,
+        'ticket_number': ticket.ticket_number,
+        'title': ticket.title,
+        'description': ticket.description,
+        'category': ticket.category,
+        'priority': ticket.priority,
+        'status': ticket.status,
+        'user_id': ticket.user_id,
+        'user_name': ticket.user_name,
+        'assigned_to': ticket.assigned_to,
+        'assignee': ticket.assignee.full_name if ticket.assignee else None,
+        'has_attachments': bool(ticket.image_filename or ticket.attachments),
+        'created_at': _isoformat(ticket.created_at),
+        'updated_at': _isoformat(ticket.updated_at),
+        'resolved_at': _isoformat(ticket.resolved_at),
+        'comment_count': ticket.comment_count,
+        'last_comment_at': _isoformat(ticket.last_comment_at),
+    }
+
+
+def comment_to_dict(comment):
+    """JSON representation of a ticket comment with its author"""
+    return {
+        'id': comment.id,
+        'ticket_id': comment.ticket_id,
+        'user_id': comment.user_id,
+        'author': comment.user.full_name if comment.user else None,
+        'comment': comment.comment,
+        'created_at': _isoformat(comment.created_at),
+    }
+
+
+def page_to_dict(page):
+    """Items and cursors of a KeysetPage"""
+    return {
+        'items': [ticket_to_dict(ticket) for ticket in page],
+        'next_cursor': page.next_cursor,
+        'prev_cursor': page.prev_cursor,
+        'next_url': page.next_url,
+        'prev_url': page.prev_url,
+    }
+
+
+def ticket_watermark(query=None):
+    """Version of the tickets in scope as serialised by ticket_to_dict, in one aggregate query
+
+    Any ticket insert or update moves the latest updated_at and any row leaving
+    the scope changes the count. Comment counters change without an updated_at
+    bump, so their sum is included, and assignee names come from users, so
+    their latest change is too. Equal watermarks mean the JSON is unchanged.
+    """
+    query = query if query is not None else Ticket.query
+    users_changed = db.session.query(func.max(User.updated_at)).scalar_subquery()
+    latest, total, comments, users_latest = query.order_by(None).with_entities(
+        func.max(Ticket.updated_at), func.count(Ticket.id),
+        func.coalesce(func.sum(Ticket.comment_count), 0), users_changed,
+    ).one()
+    return _isoformat(latest), total, int(comments), _isoformat(users_latest)
+
+
+def user_watermark():
+    """User count, newest id and latest change: moves on any add, delete, rename or role change"""
+    total, newest, latest = db.session.query(func.count(User.id), func.max(User.id), func.max(User.updated_at)).one()
+    return total, newest, _isoformat(latest)
+
+
+def make_etag(*parts):
+    """Strong ETag over the watermark, the caller's scope and the request arguments"""
+    args = sorted(request.args.items(multi=True))
+    raw = repr((parts, args)).encode()
+    return hashlib.sha1(raw).hexdigest()
+
+
+def conditional_json(etag, build):
+    """304 when the client already has this version, otherwise the JSON from build()
+
+    build is only called on a miss, so the expensive queries and serialisation
+    are skipped entirely for unchanged data.
+    """
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify(build())
+    response.set_etag(etag)
+    # Always revalidate; the ETag makes revalidation cheap
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
@@ -0,0 +1,171 @@
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import re
+from flask import abort, request, send_from_directory, url_for
+
+DIST = 'dist'  # build output, under the static folder
+MANIFEST = 'manifest.json'
+SKIP = {DIST, 'uploads'}
+COMPRESSIBLE = {'.css', '.js', '.svg', '.ico', '.json', '.txt'}
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))  # preferred first
+
+_CSS_TOKENS = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|/\*.*?\*/', re.S)
+_CSS_SPACE = re.compile(r'\s+')
+_CSS_PUNCTUATION = re.compile(r'\s*([{};,>])\s*')
+
+_manifest = None
+
+
+def _squeeze_css(code):
+    return _CSS_PUNCTUATION.sub(r'\1', _CSS_SPACE.sub(' ', code)).replace(';}', '}')
+
+
+def minify_css(source):
+    """Drop comments and layout whitespace, leaving quoted strings untouched"""
+    parts = []
+    position = 0
+    for match in _CSS_TOKENS.finditer(source):
+        # A comment still separates the tokens around it
+        parts.append(_squeeze_css(source[position:match.start()] + (' ' if match.group(1) is None else '')))
+        if match.group(1):
+            parts.append(match.group(1))
+        position = match.end()
+    parts.append(_squeeze_css(source[position:]))
+    return ''.join(parts).strip()
+
+
+def minify_js(source):
+    """Strip indentation, blank lines and whole-line comments
+
+    Line breaks are kept, so automatic semicolon insertion is unaffected;
+    lines inside multi-line template literals are copied as they are.
+    """
+    lines = []
+    in_template = False
+    in_comment = False
+    for line in source.splitlines():
+        stripped = line.strip()
+        if in_template:
+            lines.append(line)
+        elif in_comment:
+            in_comment = '*/' not in stripped
+            continue
+        elif stripped.startswith('/*'):
+            in_comment = '*/' not in stripped
+            continue
+        elif stripped and not stripped.startswith('//'):
+            lines.append(stripped)
+        else:
+            continue
+        if (line.count('`') - line.count('\\`')) % 2:
+            in_template = not in_template
+    return '\n'.join(lines) + '\n'
+
+
+MINIFIERS = {'.css': minify_css, '.js': minify_js}
+
+
+def _compress(path, data, brotli):
+    with open(f'{path}.gz', 'wb') as f:
+        # Fixed mtime: identical input gives an identical file
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        with open(f'{path}.br', 'wb') as f:
+            f.write(brotli.compress(data, quality=11))
+
+
+def build_assets(static_folder):
+    """Minify, fingerprint and precompress every static file; returns the manifest"""
+    try:
+        import brotli  # a project dependency, imported only when building
+    except ImportError:
+        brotli = None
+        logging.warning("brotli is not installed (pip install brotli); writing gzip variants only")
+    # Earlier builds are kept: pages cached before a deploy still link to them
+    output = os.path.join(static_folder, DIST)
+    os.makedirs(output, exist_ok=True)
+    manifest = {}
+    for root, dirs, files in os.walk(static_folder):
+        if root == static_folder:
+            dirs[:] = [name for name in dirs if name not in SKIP]
+        for name in sorted(files):
+            source_path = os.path.join(root, name)
+            logical = os.path.relpath(source_path, static_folder).replace(os.sep, '/')
+            stem, extension = os.path.splitext(logical)
+            with open(source_path, 'rb') as f:
+                data = f.read()
+            minify = MINIFIERS.get(extension.lower())
+            if minify:
+                data = minify(data.decode('utf-8')).encode('utf-8')
+            digest = hashlib.sha256(data).hexdigest()[:12]
+            built = f'{stem}.{digest}{extension}'
+            built_path = os.path.join(output, built)
+            os.makedirs(os.path.dirname(built_path), exist_ok=True)
+            with open(built_path, 'wb') as f:
+                f.write(data)
+            if extension.lower() in COMPRESSIBLE:
+                _compress(built_path, data, brotli)
+            manifest[logical] = f'{DIST}/{built}'
+    path = os.path.join(output, MANIFEST)
+    with open(f'{path}.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(f'{path}.tmp', path)
+    return manifest
+
+
+def _load_manifest(static_folder):
+    """Read once per process: a new build ships with a restart"""
+    global _manifest
+    if _manifest is None:
+        try:
+            with open(os.path.join(static_folder, DIST, MANIFEST)) as f:
+                _manifest = json.load(f)
+        except (OSError, ValueError):
+            _manifest = {}
+    return _manifest
+
+
+def init_assets(app):
+    """asset_url() for templates, and the /static/dist route serving built files"""
+
+    def asset_url(filename):
+        """URL of the fingerprinted build of a static file, or the file itself before a build"""
+        # In debug mode edits to static/ show up without a rebuild
+        built = None if app.debug else _load_manifest(app.static_folder).get(filename)
+        if built is None:
+            return url_for('static', filename=filename)
+        return url_for('static_asset', filename=built[len(DIST) + 1:])
+
+    app.jinja_env.globals['asset_url'] = asset_url
+
+    @app.route(f'/static/{DIST}/<path:filename>')
+    def static_asset(filename):
+        """Fingerprinted build output: cached for a year, precompressed variant when accepted"""
+        if filename == MANIFEST or filename.endswith(('.gz', '.br')):
+            abort(404)
+        directory = os.path.join(app.static_folder, DIST)
+        accepted = request.accept_encodings
+        served, encoding = filename, None
+        for name, suffix in ENCODINGS:
+            if accepted[name] and os.path.isfile(os.path.join(directory, filename + suffix)):
+                served, encoding = filename + suffix, name
+                break
+        # The name is the content hash, so the file never changes at this URL
+        response = send_from_directory(directory, served, max_age=app.config['ASSET_MAX_AGE'])
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+        response.vary.add('Accept-Encoding')
+        if encoding:
+            response.content_encoding = encoding
+            response.mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        return response
+
+    @app.cli.command('build-assets')
+    def build_assets_command():
+        """Write minified, content-hashed and precompressed static files to static/dist"""
+        manifest = build_assets(app.static_folder)
+        print(f"Built {len(manifest)} assets into {os.path.join(app.static_folder, DIST)}")
@@ -0,0 +1,172 @@
+import hashlib
+import threading
+import time
+from flask import g, session, flash, redirect, url_for, current_app, request
+from werkzeug.local import LocalProxy
+from app import db
+from models import User
+from utils.ratelimit import TokenBucketLimiter
+from utils.replica import use_primary
+
+# user_id -> ((role, fingerprint), checked_at); lets a worker trust session role
+# snapshots without re-reading the user on every request
+_fingerprints = {}
+_fingerprints_lock = threading.Lock()
+
+# Login attempt buckets per username and per client IP, created on first use
+_login_limiters = None
+_login_limiters_lock = threading.Lock()
+
+
+class Identity:
+    """Who is making the request: enough for permission checks without a User row"""
+
+    def __init__(self, user_id, role):
+        self.id = user_id
+        self.role = role
+
+    @property
+    def is_super_admin(self):
+        return self.role == 'super_admin'
+
+
+def _fingerprint(user_id, role, password_hash):
+    """Version of a user's auth state; changes when the role or password changes"""
+    return hashlib.sha256(f"{user_id}:{role}:{password_hash}".encode()).hexdigest()[:16]
+
+
+def remember_identity(user):
+    """Store the user and a versioned role snapshot in the signed session"""
+    session['user_id'] = user.id
+    session['role'] = user.role
+    session['auth_fp'] = _fingerprint(user.id, user.role, user.password_hash)
+    with _fingerprints_lock:
+        _fingerprints[user.id] = ((user.role, session['auth_fp']), time.monotonic())
+
+
+def invalidate_identity(user_id):
+    """Forget the cached auth version after a user is edited or deleted"""
+    with _fingerprints_lock:
+        _fingerprints.pop(user_id, None)
+
+
+def _snapshot_is_current(user_id, role, fp):
+    # invalidate_identity() only reaches this worker, so super admin roles get a
+    # much shorter TTL: a demoted or deleted admin loses access within seconds
+    config = current_app.config
+    ttl = config['AUTH_ADMIN_SNAPSHOT_TTL'] if role == 'super_admin' else config['AUTH_SNAPSHOT_TTL']
+    with _fingerprints_lock:
+        cached = _fingerprints.get(user_id)
+    if cached and time.monotonic() - cached[1] < ttl:
+        return cached[0] == (role, fp)
+    with use_primary():
+        # A lagging replica could still accept a revoked role or old password
+        user = db.session.get(User, user_id)
+    # Keep the row for get_current_user(), so this request doesn't load it again
+    g._current_user = user
+    current = (user.role, _fingerprint(user_id, user.role, user.password_hash)) if user else None
+    with _fingerprints_lock:
+        _fingerprints[user_id] = (current, time.monotonic())
+    return current == (role, fp)
+
+
+def client_ip():
+    """Address of the client as seen by the trusted proxy (see TRUSTED_PROXIES)"""
+    # ProxyFix has already replaced remote_addr with the hop our proxy appended;
+    # earlier X-Forwarded-For entries are whatever the client chose to send
+    return request.remote_addr
+
+
+def _limiters():
+    global _login_limiters
+    with _login_limiters_lock:
+        if _login_limiters is None:
+            config = current_app.config
+            _login_limiters = (
+                TokenBucketLimiter(config['LOGIN_USER_RATE'], config['LOGIN_USER_BURST']),
+                TokenBucketLimiter(config['LOGIN_IP_RATE'], config['LOGIN_IP_BURST']),
+            )
+        return _login_limiters
+
+
+def login_retry_after(username, ip_address):
+    """Seconds before another login attempt is allowed for this username and IP, or 0"""
+    buckets = tuple(zip(_limiters(), (username.lower(), ip_address)))
+    # Check both before taking from either, so a rejected attempt costs nothing
+    retry_after = max(limiter.check(key) for limiter, key in buckets)
+    if retry_after:
+        return retry_after
+    for limiter, key in buckets:
+        allowed, retry_after = limiter.allow(key)
+        if not allowed:
+            return retry_after
+    return 0
+
+
+# Helper function to check if user is logged in
+def is_logged_in():
+    return 'user_id' in session
+
+
+# Helper function to get current user, loaded at most once per request
+def get_current_user():
+    if not is_logged_in():
+        return None
+    if '_current_user' not in g:
+        g._current_user = db.session.get(User, session['user_id'])
+    return g._current_user
+
+
+def get_identity():
+    """Identity of the logged-in user, from the session snapshot when it can be trusted"""
+    if not is_logged_in():
+        return None
+    if '_identity' in g:
+        return g._identity
+
+    identity = None
+    user_id = session['user_id']
+    if (current_app.config['AUTH_TRUST_SESSION'] and 'role' in session
+            and _snapshot_is_current(user_id, session['role'], session.get('auth_fp'))):
+        identity = Identity(user_id, session['role'])
+    else:
+        user = get_current_user()
+        if user:
+            # Refresh a missing or outdated snapshot for the next request
+            remember_identity(user)
+            identity = Identity(user.id, user.role)
+        else:
+            # The account was deleted under an active session
+            session.clear()
+    g._identity = identity
+    return identity
+
+
+# Template access to the user; only loaded if a template actually uses it
+current_user = LocalProxy(get_current_user)
+
+
+# Helper function to require login
+def login_required(f):
+    def decorated_function(*args, **kwargs):
+        if not get_identity():
+            flash('Please log in to access this page.', 'warning')
+            return redirect(url_for('common_login'))
+        return f(*args, **kwargs)
+    decorated_function.__name__ = f.__name__
+    return decorated_function
+
+
+# Helper function to require super admin
+def super_admin_required(f):
+    def decorated_function(*args, **kwargs):
+        identity = get_identity()
+        if not identity:
+            flash('Please log in to access this page.', 'warning')
+            return redirect(url_for('common_login'))
+        if not identity.is_super_admin:
+            flash('Super Admin access required.', 'error')
+            return redirect(url_for('index'))
+        return f(*args, **kwargs)
+    decorated_function.__name__ = f.__name__
+    return decorated_function
@@ -0,0 +1,278 @@
+import contextvars
+import json
+import os
+import random
+import re
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http.cookies import SimpleCookie
+from urllib.error import HTTPError
+from urllib.parse import urlencode
+from urllib.request import HTTPRedirectHandler, Request, build_opener
+import click
+from sqlalchemy import func
+from app import app, db
+from models import Ticket
+
+# Runs in a fresh interpreter: imports the app the way a worker does and
+# reports what that cost, including any database access it caused
+_STARTUP_PROBE = '''
+import json, resource, sys, time
+start = time.perf_counter()
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+activity = {"connections": 0, "statements": 0}
+event.listen(Engine, "connect", lambda *args: activity.__setitem__("connections", activity["connections"] + 1))
+event.listen(Engine, "before_cursor_execute", lambda *args: activity.__setitem__("statements", activity["statements"] + 1))
+import main
+activity["import_seconds"] = time.perf_counter() - start
+activity["max_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+activity["modules"] = len(sys.modules)
+activity["openpyxl_loaded"] = "openpyxl" in sys.modules
+print(json.dumps(activity))
+'''
+
+
+def measure_startup(runs=5):
+    """Import the app in fresh processes; returns one measurement dict per run"""
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    results = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, '-c', _STARTUP_PROBE], cwd=root, check=True,
+                                capture_output=True, text=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        result['process_seconds'] = time.perf_counter() - start
+        results.append(result)
+    return results
+
+
+@app.cli.command('bench-startup')
+@click.option('--runs', default=5, show_default=True, help='Fresh worker imports to time')
+def bench_startup_command(runs):
+    """Measure worker cold start: import time, peak memory and database access"""
+    results = measure_startup(runs)
+    import_times = [result['import_seconds'] for result in results]
+    process_times = [result['process_seconds'] for result in results]
+    print(f"runs:               {runs}")
+    print(f"import (median/max): {statistics.median(import_times) * 1000:.0f} / {max(import_times) * 1000:.0f} ms")
+    print(f"process (median):    {statistics.median(process_times) * 1000:.0f} ms")
+    print(f"peak RSS:            {max(result['max_rss_kb'] for result in results) / 1024:.1f} MB")
+    print(f"modules loaded:      {results[0]['modules']}")
+    print(f"openpyxl loaded:     {results[0]['openpyxl_loaded']}")
+    print(f"DB connections:      {results[0]['connections']}")
+    print(f"SQL statements:      {results[0]['statements']}")
+    if results[0]['connections'] or results[0]['statements']:
+        # Connections opened before gunicorn --preload forks would be shared by every worker
+        raise click.ClickException('importing the app touched the database')
+
+
+_CSRF_TOKEN = re.compile(r'name="csrf_token" type="hidden" value="([^"]+)"')
+SEARCH_TERMS = ('printer', 'vpn', 'network', 'laptop', 'outlook', 'scanner')
+
+
+class _NoRedirect(HTTPRedirectHandler):
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class ClientTransport:
+    """Requests through the Flask test client, one client per thread"""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def send(self, method, path, data=None, cookie=None):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = app.test_client(use_cookies=False)
+        headers = {'Cookie': cookie} if cookie else {}
+        # An empty context, so requests never share g with the CLI's app context
+        return contextvars.Context().run(self._send, client, method, path, data, headers)
+
+    @staticmethod
+    def _send(client, method, path, data, headers):
+        response = client.open(path, method=method, data=data, headers=headers)
+        body = response.get_data()  # drains streamed bodies
+        response.close()
+        return response.status_code, body, response.headers.getlist('Set-Cookie')
+
+
+class HTTPTransport:
+    """Requests over real sockets to a running server"""
+
+    def __init__(self, base_url):
+        self.base_url = base_url.rstrip('/')
+        self._opener = build_opener(_NoRedirect)
+
+    def send(self, method, path, data=None, cookie=None):
+        request = Request(self.base_url + path, method=method,
+                          data=urlencode(data).encode() if data is not None else None)
+        if cookie:
+            request.add_header('Cookie', cookie)
+        try:
+            with self._opener.open(request, timeout=120) as response:
+                return response.status, response.read(), response.headers.get_all('Set-Cookie') or []
+        except HTTPError as e:
+            return e.code, e.read(), e.headers.get_all('Set-Cookie') or []
+
+
+def _session_cookie(set_cookies, cookie):
+    name = app.config['SESSION_COOKIE_NAME']
+    for header in set_cookies:
+        parsed = SimpleCookie(header)
+        if name in parsed:
+            return f'{name}={parsed[name].value}'
+    return cookie
+
+
+def sign_in(transport, username, password):
+    """Log in once; returns (session cookie, CSRF token) shared by every worker thread
+
+    Sharing one session keeps the login rate limiter out of the measurements.
+    """
+    status, body, set_cookies = transport.send('GET', '/login')
+    cookie = _session_cookie(set_cookies, None)
+    token = _CSRF_TOKEN.search(body.decode()).group(1)
+    status, body, set_cookies = transport.send('POST', '/login', {
+        'csrf_token': token, 'username': username, 'password': password}, cookie)
+    if status != 302:
+        raise click.ClickException(f'could not log in as {username} (HTTP {status})')
+    cookie = _session_cookie(set_cookies, cookie)
+    # A rendered form puts the CSRF secret in the session; keep that version of the cookie
+    status, body, set_cookies = transport.send('GET', '/create-ticket', cookie=cookie)
+    return _session_cookie(set_cookies, cookie), _CSRF_TOKEN.search(body.decode()).group(1)
+
+
+def _scenarios(ticket_ids, month):
+    """name -> (role, writes, request builder returning (method, path, form data))"""
+    return {
+        'admin_dashboard': ('admin', False, lambda rng: ('GET', '/super-admin-dashboard', None)),
+        'admin_search': ('admin', False, lambda rng: (
+            'GET', f'/super-admin-dashboard?search={rng.choice(SEARCH_TERMS)}', None)),
+        'user_dashboard': ('user', False, lambda rng: ('GET', '/user-dashboard', None)),
+        'reports_dashboard': ('admin', False, lambda rng: ('GET', '/reports-dashboard', None)),
+        'view_ticket': ('admin', False, lambda rng: ('GET', f'/ticket/{rng.choice(ticket_ids)}', None)),
+        'export_xlsx': ('admin', False, lambda rng: (
+            'GET', f'/download-excel-report?filter_mode=month&month={month}&format=xlsx', None)),
+        'create_ticket': ('user', True, lambda rng: ('POST', '/create-ticket', {
+            'title': f'Benchmark ticket {rng.randrange(10 ** 6)}',
+            'description': 'Created by flask bench-routes to measure ticket creation.',
+            'category': rng.choice(('Hardware', 'Software')),
+            'priority': rng.choice(('Low', 'Medium', 'High', 'Critical')),
+            'system_name': 'BENCH-PC'})),
+        'add_comment': ('admin', True, lambda rng: ('POST', f'/ticket/{rng.choice(ticket_ids)}/comment', {
+            'comment': 'Benchmark comment from flask bench-routes.'})),
+    }
+
+
+def _percentile(cuts, q):
+    return cuts[q - 1] * 1000 if cuts else 0.0
+
+
+def run_scenario(transport, build, cookie, token, requests, concurrency, seed=0):
+    """Send requests through concurrency threads; returns latency percentiles and throughput"""
+    rng = random.Random(seed)
+    planned = [build(rng) for _ in range(requests + 1)]
+
+    def send(item):
+        method, path, data = item
+        if data is not None:
+            data = dict(data, csrf_token=token)
+        start = time.perf_counter()
+        status, body, set_cookies = transport.send(method, path, data, cookie)
+        return time.perf_counter() - start, status < 400
+
+    send(planned.pop())  # warm caches and connections outside the measurement
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(send, planned))
+    elapsed = time.perf_counter() - start
+    latencies = sorted(seconds for seconds, ok in results)
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive') if len(latencies) > 1 else latencies * 99
+    return {
+        'count': len(results),
+        'errors': sum(1 for seconds, ok in results if not ok),
+        'p50_ms': round(_percentile(cuts, 50), 2),
+        'p95_ms': round(_percentile(cuts, 95), 2),
+        'p99_ms': round(_percentile(cuts, 99), 2),
+        'rps': round(len(results) / elapsed, 1) if elapsed else 0.0,
+    }
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """Scenarios whose p95 grew more than tolerance, or which started failing"""
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get('scenarios', {}).get(name)
+        if not before:
+            continue
+        if result['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before['p95_ms']:.1f} -> {result['p95_ms']:.1f} ms")
+        if result['errors'] and not before['errors']:
+            regressions.append(f"{name}: {result['errors']} errors (baseline had none)")
+    return regressions
+
+
+@app.cli.command('bench-routes')
+@click.option('--requests', 'request_count', default=200, show_default=True, help='Measured requests per scenario')
+@click.option('--concurrency', default=8, show_default=True, help='Requests in flight at once')
+@click.option('--url', default=None, help='Base URL of a running server; default drives the app in-process')
+@click.option('--scenario', 'selected', multiple=True, help='Only run these scenarios (repeatable)')
+@click.option('--read-only', is_flag=True, help='Skip scenarios that create tickets or comments')
+@click.option('--admin', default='superadmin:super123', show_default=True, help='Super admin username:password')
+@click.option('--user', default='testuser:test123', show_default=True, help='Regular user username:password')
+@click.option('--baseline', type=click.Path(dir_okay=False), default=None, help='Baseline JSON to compare against')
+@click.option('--save-baseline', is_flag=True, help='Write these results to --baseline instead of comparing')
+@click.option('--tolerance', default=0.2, show_default=True, help='Allowed p95 growth over the baseline')
+def bench_routes_command(request_count, concurrency, url, selected, read_only, admin, user,
+                         baseline, save_baseline, tolerance):
+    """Load-test the main routes and report p50/p95/p99 latency and throughput"""
+    # Ticket ids come from this app's database, so --url must serve the same one
+    ticket_ids = [row.id for row in db.session.query(Ticket.id).order_by(func.random()).limit(1000)]
+    ticket_count = db.session.query(func.count(Ticket.id)).scalar()
+    db.session.remove()
+    if not ticket_ids:
+        raise click.ClickException('no tickets to view; load some with flask generate-data')
+
+    scenarios = _scenarios(ticket_ids, datetime.utcnow().strftime('%Y-%m'))
+    unknown = set(selected) - set(scenarios)
+    if unknown:
+        raise click.BadParameter(f"unknown scenario(s) {', '.join(sorted(unknown))}; "
+                                 f"choose from {', '.join(scenarios)}", param_hint='--scenario')
+    transport = HTTPTransport(url) if url else ClientTransport()
+    sessions = {role: sign_in(transport, *credentials.split(':', 1))
+                for role, credentials in (('admin', admin), ('user', user))}
+
+    print(f"{'scenario':<18} {'count':>6} {'errors':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>8}")
+    results = {}
+    for name, (role, writes, build) in scenarios.items():
+        if (selected and name not in selected) or (writes and read_only):
+            continue
+        result = results[name] = run_scenario(transport, build, *sessions[role], request_count, concurrency)
+        print(f"{name:<18} {result['count']:>6} {result['errors']:>6} {result['p50_ms']:>9.1f} "
+              f"{result['p95_ms']:>9.1f} {result['p99_ms']:>9.1f} {result['rps']:>8.1f}")
+
+    if not baseline:
+        return
+    if save_baseline:
+        with open(baseline, 'w') as f:
+            json.dump({'mode': url or 'test-client', 'database': db.engine.dialect.name,
+                       'tickets': ticket_count, 'requests': request_count, 'concurrency': concurrency,
+                       'recorded_at': datetime.utcnow().isoformat(timespec='seconds'),
+                       'scenarios': results}, f, indent=2)
+        print(f"Baseline written to {baseline}")
+        return
+    with open(baseline) as f:
+        recorded = json.load(f)
+    if (recorded['tickets'], recorded['concurrency']) != (ticket_count, concurrency):
+        print(f"Note: baseline ran with {recorded['tickets']} tickets at concurrency {recorded['concurrency']}")
+    regressions = compare_to_baseline(results, recorded, tolerance)
+    if regressions:
+        raise click.ClickException('slower than baseline:\n  ' + '\n  '.join(regressions))
+    print(f"Within {tolerance:.0%} of the baseline p95 for every scenario")
@@ -0,0 +1,118 @@
+from datetime import datetime
+from sqlalchemy import case, insert, update
+from app import app, db
+from models import Ticket, TicketComment, User
+from utils.rollups import RollupDeltas, apply_rollup_deltas
+from utils.search import refresh_ticket_search
+
+
+def parse_ticket_ids(value):
+    """Ticket IDs from a comma-separated form value, de-duplicated and capped at BULK_MAX_TICKETS"""
+    ids = []
+    for part in (value or '').split(','):
+        part = part.strip()
+        if part.isdigit() and int(part) not in ids:
+            ids.append(int(part))
+    if len(ids) > app.config['BULK_MAX_TICKETS']:
+        raise ValueError(f"At most {app.config['BULK_MAX_TICKETS']} tickets can be changed at once.")
+    return ids
+
+
+def matching_ticket_ids(query):
+    """IDs of every ticket a filtered Ticket query matches, refused beyond BULK_MAX_TICKETS"""
+    limit = app.config['BULK_MAX_TICKETS']
+    ids = [row.id for row in query.order_by(None).with_entities(Ticket.id).limit(limit + 1)]
+    if len(ids) > limit:
+        raise ValueError(f"More than {limit} tickets match the current filters; narrow them and try again.")
+    return ids
+
+
+def _lock_tickets(ticket_ids, *conditions):
+    """Current rollup columns of the tickets about to change, row-locked where supported"""
+    return (db.session.query(Ticket.id, Ticket.category, Ticket.priority, Ticket.status, Ticket.created_at)
+            .filter(Ticket.id.in_(ticket_ids), *conditions)
+            .order_by(Ticket.id)
+            .with_for_update()
+            .all())
+
+
+def _add_comments(rows, actor_id, text_for, now):
+    """Audit trail: one comment per changed ticket, in a single multi-row INSERT
+
+    Bulk inserts skip the ORM events that keep the ticket comment counters, so
+    the caller's UPDATE includes _count_one_comment().
+    """
+    db.session.execute(insert(TicketComment), [
+        {'ticket_id': row.id, 'user_id': actor_id, 'comment': text_for(row), 'created_at': now}
+        for row in rows
+    ])
+    refresh_ticket_search(*[row.id for row in rows])
+
+
+def _count_one_comment(now):
+    return {'comment_count': Ticket.comment_count + 1, 'last_comment_at': now}
+
+
+def bulk_update_status(ticket_ids, status, actor_id, note=''):
+    """Move the given tickets to status in one UPDATE; returns the number changed
+
+    Tickets already in the status are left alone. resolved_at is set when a
+    ticket becomes Resolved and cleared otherwise, as edit_ticket does.
+    The bulk UPDATE bypasses the ORM flush, so rollup deltas are applied here.
+    """
+    rows = _lock_tickets(ticket_ids, Ticket.status != status)
+    if not rows:
+        db.session.rollback()
+        return 0
+    now = datetime.utcnow()
+    db.session.execute(
+        update(Ticket)
+        .where(Ticket.id.in_([row.id for row in rows]))
+        .values(status=status, updated_at=now, resolved_at=now if status == 'Resolved' else None,
+                **_count_one_comment(now))
+        .execution_options(synchronize_session=False)
+    )
+
+    suffix = f" {note}" if note else ''
+    _add_comments(rows, actor_id, lambda row: f"Status updated from '{row.status}' to '{status}'.{suffix}", now)
+
+    deltas = RollupDeltas()
+    for row in rows:
+        deltas.moved(now, row.category, row.priority, row.status, status, row.created_at, now)
+    apply_rollup_deltas(db.session.connection(), deltas)
+    db.session.commit()
+    return len(rows)
+
+
+def bulk_assign(ticket_ids, assignee_id, actor_id, note=''):
+    """Assign the given tickets in one UPDATE; returns the number changed
+
+    Open tickets move to In Progress, like a single assignment does.
+    """
+    assignee = db.session.get(User, assignee_id)
+    if assignee is None or not assignee.is_super_admin:
+        raise ValueError('Tickets can only be assigned to a super admin.')
+    rows = _lock_tickets(ticket_ids)
+    if not rows:
+        db.session.rollback()
+        return 0
+    now = datetime.utcnow()
+    db.session.execute(
+        update(Ticket)
+        .where(Ticket.id.in_([row.id for row in rows]))
+        .values(assigned_to=assignee.id, assigned_by=actor_id, updated_at=now,
+                status=case((Ticket.status == 'Open', 'In Progress'), else_=Ticket.status),
+                **_count_one_comment(now))
+        .execution_options(synchronize_session=False)
+    )
+
+    suffix = f" {note}" if note else ''
+    _add_comments(rows, actor_id, lambda row: f"Assigned to {assignee.full_name}.{suffix}", now)
+
+    deltas = RollupDeltas()
+    for row in rows:
+        if row.status == 'Open':
+            deltas.moved(now, row.category, row.priority, 'Open', 'In Progress')
+    apply_rollup_deltas(db.session.connection(), deltas)
+    db.session.commit()
+    return len(rows)
@@ -0,0 +1,31 @@
+import importlib
+from flask.cli import AppGroup
+
+
+class LazyAppGroup(AppGroup):
+    """app.cli that imports command-only modules when the flask command first looks up a command
+
+    Web workers never list CLI commands, so they never import these modules.
+    """
+
+    def __init__(self, modules, **kwargs):
+        super().__init__(**kwargs)
+        self._modules = list(modules)
+
+    def _import_modules(self):
+        while self._modules:
+            # The modules register their commands on app.cli, i.e. on this group
+            importlib.import_module(self._modules.pop(0))
+
+    def list_commands(self, ctx):
+        self._import_modules()
+        return super().list_commands(ctx)
+
+    def get_command(self, ctx, cmd_name):
+        self._import_modules()
+        return super().get_command(ctx, cmd_name)
+
+
+def defer_commands(app, *modules):
+    """Register the commands defined in modules without importing them in web workers"""
+    app.cli = LazyAppGroup(modules, name=app.cli.name, commands=app.cli.commands)
@@ -0,0 +1,34 @@
+from sqlalchemy import func, select, update
+from app import app, db
+from models import Ticket, TicketComment
+from utils.pagination import keyset_paginate
+
+
+def comment_page(ticket_id):
+    """One newest-first page of a ticket's comments, positioned by ?comments_next="""
+    query = TicketComment.query.options(*TicketComment.listing_options()).filter(TicketComment.ticket_id == ticket_id)
+    return keyset_paginate(query, TicketComment, per_page=app.config['COMMENTS_PAGE_SIZE'], param='comments')
+
+
+def rebuild_comment_counters():
+    """Recount comment_count and last_comment_at for every ticket; returns tickets updated"""
+    comments = TicketComment.__table__
+    result = db.session.execute(
+        update(Ticket.__table__)
+        .values(
+            comment_count=select(func.count()).where(comments.c.ticket_id == Ticket.__table__.c.id)
+            .scalar_subquery(),
+            last_comment_at=select(func.max(comments.c.created_at))
+            .where(comments.c.ticket_id == Ticket.__table__.c.id).scalar_subquery(),
+            # A recount is not an edit of the ticket
+            updated_at=Ticket.__table__.c.updated_at,
+        )
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+@app.cli.command('rebuild-comment-counters')
+def rebuild_comment_counters_command():
+    """Backfill tickets.comment_count and last_comment_at from ticket_comments"""
+    print(f"Recounted comments of {rebuild_comment_counters()} tickets")
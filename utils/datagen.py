@@ -0,0 +1,220 @@
+import hashlib
+import random
+import time
+from datetime import datetime, timedelta
+from itertools import accumulate
+import click
+from sqlalchemy import func, text
+from app import app, db
+from models import Attachment, Ticket, TicketComment, User
+from utils.passwords import hash_password
+
+GENERATED_PASSWORD = 'bench123'
+
+STATUS_WEIGHTS = {'Open': 20, 'In Progress': 15, 'Resolved': 45, 'Closed': 20}
+CATEGORY_WEIGHTS = {'Hardware': 35, 'Software': 40, 'Network': 15, 'Other': 10}
+PRIORITY_WEIGHTS = {'Low': 30, 'Medium': 40, 'High': 22, 'Critical': 8}
+DEPARTMENTS = ['Engineering', 'Production', 'Quality', 'Maintenance', 'Logistics', 'Finance', 'HR', 'IT']
+FIRST_NAMES = ['Aarav', 'Priya', 'Rahul', 'Ananya', 'Vikram', 'Sneha', 'Arjun', 'Divya', 'Karthik', 'Meera',
+               'Rohan', 'Kavya', 'Suresh', 'Lakshmi', 'Nikhil', 'Pooja', 'Amit', 'Deepa', 'Ravi', 'Sunita']
+LAST_NAMES = ['Sharma', 'Iyer', 'Patel', 'Reddy', 'Nair', 'Gupta', 'Menon', 'Rao', 'Singh', 'Kumar',
+              'Joshi', 'Pillai', 'Das', 'Verma', 'Bose']
+SUBJECTS = ['printer', 'laptop', 'VPN', 'email', 'SAP login', 'network drive', 'monitor', 'keyboard',
+            'Wi-Fi', 'CAD license', 'scanner', 'Outlook', 'password reset', 'PLC terminal', 'barcode reader']
+PROBLEMS = ['not working', 'very slow', 'keeps disconnecting', 'shows an error', 'cannot start',
+            'needs replacement', 'access denied', 'freezes randomly', 'not detected', 'stopped syncing']
+COMMENT_PHRASES = ['Checked the device, issue reproduced.', 'Restarted the service, please verify.',
+                   'Waiting for spare part from vendor.', 'Driver updated to the latest version.',
+                   'User confirmed the problem is fixed.', 'Escalated to network team.',
+                   'Cable replaced and tested.', 'Please share a screenshot of the error.',
+                   'Remote session scheduled for tomorrow.', 'License renewed, try again.']
+FILE_TYPES = [('jpg', 'image/jpeg'), ('png', 'image/png'), ('pdf', 'application/pdf'),
+              ('docx', 'application/vnd.openxmlformats-officedocument.wordprocessingml.document'),
+              ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')]
+
+
+def _zipf_weights(n, exponent=1.1):
+    """Cumulative weights giving rank r a share proportional to 1/r^exponent (a few very active items)"""
+    return list(accumulate(1.0 / (rank ** exponent) for rank in range(1, n + 1)))
+
+
+def _weighted(rng, weights, k):
+    return rng.choices(list(weights), weights=list(weights.values()), k=k)
+
+
+def _next_id(model):
+    return (db.session.query(func.max(model.id)).scalar() or 0) + 1
+
+
+def _insert(model, rows):
+    # Core executemany: no ORM events, so rollups and search are rebuilt at the end
+    db.session.execute(model.__table__.insert(), rows)
+    db.session.commit()
+
+
+def _sync_sequence(model):
+    """Move PostgreSQL's id sequence past explicitly inserted ids"""
+    if db.session.get_bind().dialect.name == 'postgresql':
+        table = model.__tablename__
+        db.session.execute(text(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), "
+                                f"(SELECT coalesce(max(id), 1) FROM {table}))"))
+        db.session.commit()
+
+
+def _created_at(rng, now, days):
+    # Skewed towards recent days: volume grows over time
+    return now - timedelta(days=days * (rng.random() ** 2), seconds=rng.randrange(86400))
+
+
+def generate_users(rng, count, admins, batch_size):
+    password_hash = hash_password(GENERATED_PASSWORD)  # one hash shared by all generated accounts
+    first_id = _next_id(User)
+    tag = f'{first_id:x}'
+    now = datetime.utcnow()
+    for start in range(0, count, batch_size):
+        rows = []
+        for offset in range(start, min(start + batch_size, count)):
+            user_id = first_id + offset
+            first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            rows.append({
+                'id': user_id,
+                'username': f'{first.lower()}.{last.lower()}.{tag}{offset}',
+                'email': f'{first.lower()}.{last.lower()}.{tag}{offset}@example.com',
+                'password_hash': password_hash,
+                'first_name': first,
+                'last_name': last,
+                'department': rng.choice(DEPARTMENTS),
+                'role': 'super_admin' if offset < admins else 'user',
+                'ip_address': f'10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}',
+                'system_name': f'GTN-PC-{rng.randrange(10000):04d}',
+                'created_at': now - timedelta(days=rng.randrange(1000)),
+            })
+        _insert(User, rows)
+        print(f"users: {min(start + batch_size, count)}/{count}")
+    _sync_sequence(User)
+    return list(range(first_id, first_id + count))
+
+
+def generate_tickets(rng, count, user_ids, admin_ids, days, batch_size):
+    names = {row.id: f'{row.first_name} {row.last_name}' for row in
+             db.session.query(User.id, User.first_name, User.last_name).filter(User.id >= min(user_ids))}
+    creators = user_ids[:]
+    rng.shuffle(creators)
+    creator_weights = _zipf_weights(len(creators))
+    first_id = _next_id(Ticket)
+    now = datetime.utcnow()
+    for start in range(0, count, batch_size):
+        size = min(batch_size, count - start)
+        statuses = _weighted(rng, STATUS_WEIGHTS, size)
+        categories = _weighted(rng, CATEGORY_WEIGHTS, size)
+        priorities = _weighted(rng, PRIORITY_WEIGHTS, size)
+        owners = rng.choices(creators, cum_weights=creator_weights, k=size)
+        rows = []
+        for index in range(size):
+            created_at = _created_at(rng, now, days)
+            status = statuses[index]
+            resolved_at = None
+            if status in ('Resolved', 'Closed'):
+                # Log-normal time to resolve: median ~8h, long tail of weeks
+                resolved_at = min(now, created_at + timedelta(hours=rng.lognormvariate(2.1, 1.3)))
+            assigned = status != 'Open' and admin_ids
+            subject = rng.choice(SUBJECTS)
+            rows.append({
+                'id': first_id + start + index,
+                'title': f'{subject.capitalize()} {rng.choice(PROBLEMS)}',
+                'description': f'The {subject} in {rng.choice(DEPARTMENTS)} {rng.choice(PROBLEMS)}. '
+                               f'Started around {created_at:%H:%M}; please help as soon as possible.',
+                'category': categories[index],
+                'priority': priorities[index],
+                'status': status,
+                'user_name': names.get(owners[index], 'Generated User'),
+                'user_ip_address': f'10.{rng.randrange(256)}.{rng.randrange(256)}.{rng.randrange(1, 255)}',
+                'user_system_name': f'GTN-PC-{rng.randrange(10000):04d}',
+                'user_id': owners[index],
+                'assigned_to': rng.choice(admin_ids) if assigned else None,
+                'assigned_by': admin_ids[0] if assigned else None,
+                'created_at': created_at,
+                'updated_at': resolved_at or created_at,
+                'resolved_at': resolved_at,
+            })
+        _insert(Ticket, rows)
+        print(f"tickets: {start + size}/{count}")
+    _sync_sequence(Ticket)
+    return first_id, first_id + count
+
+
+def generate_comments(rng, count, ticket_range, user_ids, batch_size):
+    first, end = ticket_range
+    ticket_ids = list(range(first, end))
+    rng.shuffle(ticket_ids)
+    # A few hot tickets collect long threads; most get one or two comments
+    ticket_weights = _zipf_weights(len(ticket_ids), exponent=0.8)
+    now = datetime.utcnow()
+    for start in range(0, count, batch_size):
+        size = min(batch_size, count - start)
+        targets = rng.choices(ticket_ids, cum_weights=ticket_weights, k=size)
+        rows = [{
+            'ticket_id': ticket_id,
+            'user_id': rng.choice(user_ids),
+            'comment': ' '.join(rng.sample(COMMENT_PHRASES, rng.randint(1, 3))),
+            'created_at': now - timedelta(days=rng.random() * 365),
+        } for ticket_id in targets]
+        _insert(TicketComment, rows)
+        print(f"comments: {start + size}/{count}")
+
+
+def generate_attachments(rng, count, ticket_range, batch_size):
+    first, end = ticket_range
+    now = datetime.utcnow()
+    for start in range(0, count, batch_size):
+        size = min(batch_size, count - start)
+        rows = []
+        for index in range(size):
+            extension, content_type = rng.choice(FILE_TYPES)
+            sha256 = hashlib.sha256(f'{start + index}:{rng.random()}'.encode()).hexdigest()
+            rows.append({
+                'ticket_id': rng.randrange(first, end),
+                'filename': f'{sha256[:12]}_attachment.{extension}',
+                'sha256': sha256,
+                'size': int(rng.lognormvariate(12, 1.5)),  # median ~160 KB, tail into tens of MB
+                'content_type': content_type,
+                'uploaded_at': now - timedelta(days=rng.random() * 365),
+            })
+        _insert(Attachment, rows)
+        print(f"attachments: {start + size}/{count}")
+
+
+@app.cli.command('generate-data')
+@click.option('--users', default=50000, show_default=True)
+@click.option('--admins', default=25, show_default=True, help='How many of the users are super admins')
+@click.option('--tickets', default=1000000, show_default=True)
+@click.option('--comments', default=5000000, show_default=True)
+@click.option('--attachments', default=200000, show_default=True)
+@click.option('--days', default=730, show_default=True, help='Spread ticket creation over this many days')
+@click.option('--batch-size', default=10000, show_default=True)
+@click.option('--seed', default=42, show_default=True)
+@click.option('--skip-index', is_flag=True, help='Do not rebuild the search index and rollups afterwards')
+def generate_data_command(users, admins, tickets, comments, attachments, days, batch_size, seed, skip_index):
+    """Bulk-load a synthetic dataset for load testing (never run against production)"""
+    from utils.comments import rebuild_comment_counters
+    from utils.rollups import rebuild_rollups
+    from utils.search import rebuild_search_index
+
+    rng = random.Random(seed)
+    started = time.monotonic()
+    user_ids = generate_users(rng, users, min(admins, users), batch_size)
+    admin_ids = user_ids[:admins]
+    if not user_ids:
+        # Spread generated tickets over the accounts that already exist
+        user_ids = [row.id for row in db.session.query(User.id)]
+    if not admin_ids:
+        admin_ids = [row.id for row in db.session.query(User.id).filter_by(role='super_admin')]
+    ticket_range = generate_tickets(rng, tickets, user_ids, admin_ids, days, batch_size) if tickets else None
+    if ticket_range:
+        generate_comments(rng, comments, ticket_range, user_ids, batch_size)
+        print(f"comment counters: {rebuild_comment_counters()} tickets")
+        generate_attachments(rng, attachments, ticket_range, batch_size)
+        if not skip_index:
+            print(f"search index: {rebuild_search_index(batch_size)} tickets")
+            print(f"rollups: {rebuild_rollups(batch_size)} tickets")
+    print(f"Generated in {time.monotonic() - started:.0f}s; generated users log in with password '{GENERATED_PASSWORD}'")
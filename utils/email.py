@@ -1,25 +1,151 @@
+import logging
+import os
+import queue
 import smtplib
+import threading
+import time
 from email.mime.text import MIMEText
 from flask import current_app
 
+# Messages waiting to be sent. Routes only enqueue; worker threads own SMTP.
+_outbox = queue.Queue()
+_workers = []
+_workers_pid = None
+_workers_lock = threading.Lock()
 
-def send_assignment_email(to_email, ticket_id, assignee_name):
-    smtp_server = 'smtp.gmail.com'
-    smtp_port = 587
-    smtp_username = current_app.config[
-        'narainjkans@gmail.com']  # e.g., 'youraccount@gmail.com'
-    smtp_password = current_app.config[
-        'hefh vudq kkly wfsd']  # App password, not your Gmail login password
 
+class OutgoingEmail:
+    """A queued message plus its delivery attempt count"""
+
+    def __init__(self, to_email, subject, body):
+        self.to_email = to_email
+        self.subject = subject
+        self.body = body
+        self.attempts = 0
+
+
+def _mail_settings(config):
+    return {
+        'server': config['MAIL_SERVER'],
+        'port': config['MAIL_PORT'],
+        'use_tls': config['MAIL_USE_TLS'],
+        'username': config['MAIL_USERNAME'],
+        'password': config['MAIL_PASSWORD'],
+        'sender': config['MAIL_DEFAULT_SENDER'] or config['MAIL_USERNAME'],
+        'timeout': config['MAIL_TIMEOUT'],
+        'batch_size': config['MAIL_BATCH_SIZE'],
+        'max_retries': config['MAIL_MAX_RETRIES'],
+        'retry_backoff': config['MAIL_RETRY_BACKOFF'],
+    }
+
+
+def _open_connection(settings):
+    """Open one SMTP session (STARTTLS + login when configured) for a whole batch"""
+    server = smtplib.SMTP(settings['server'], settings['port'], timeout=settings['timeout'])
+    if settings['use_tls']:
+        server.starttls()
+    if settings['username']:
+        server.login(settings['username'], settings['password'])
+    return server
+
+
+def _retry_later(message, settings, error):
+    """Re-queue a failed message after an exponential backoff, or give up"""
+    message.attempts += 1
+    if message.attempts > settings['max_retries']:
+        logging.error(f"Giving up on email to {message.to_email} after {message.attempts} attempts: {error}")
+        return
+    delay = settings['retry_backoff'] * (2 ** (message.attempts - 1))
+    logging.warning(f"Email to {message.to_email} failed ({error}); retrying in {delay:g}s")
+    timer = threading.Timer(delay, _outbox.put, args=(message,))
+    timer.daemon = True
+    timer.start()
+
+
+def _send_batch(batch, settings):
+    try:
+        server = _open_connection(settings)
+    except (smtplib.SMTPException, OSError) as e:
+        for message in batch:
+            _retry_later(message, settings, e)
+        return
+    try:
+        for message in batch:
+            msg = MIMEText(message.body)
+            msg['Subject'] = message.subject
+            msg['From'] = settings['sender']
+            msg['To'] = message.to_email
+            try:
+                server.sendmail(settings['sender'], [message.to_email], msg.as_string())
+            except (smtplib.SMTPException, OSError) as e:
+                _retry_later(message, settings, e)
+    finally:
+        try:
+            server.quit()
+        except (smtplib.SMTPException, OSError):
+            pass
+
+
+def _worker(settings):
+    while True:
+        batch = [_outbox.get()]
+        # Drain whatever else is already waiting so it shares the connection
+        while len(batch) < settings['batch_size']:
+            try:
+                batch.append(_outbox.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            _send_batch(batch, settings)
+        except Exception as e:
+            logging.error(f"Unexpected error in email worker: {e}")
+        finally:
+            for _ in batch:
+                _outbox.task_done()
+
+
+def _ensure_workers():
+    """Start the worker pool lazily, once per process (gunicorn forks after import)"""
+    global _workers_pid
+    with _workers_lock:
+        if _workers_pid == os.getpid():
+            return
+        settings = _mail_settings(current_app.config)
+        _workers.clear()
+        for i in range(current_app.config['MAIL_WORKERS']):
+            worker = threading.Thread(target=_worker, args=(settings,), name=f'email-worker-{i}', daemon=True)
+            worker.start()
+            _workers.append(worker)
+        _workers_pid = os.getpid()
+
+
+def queue_email(to_email, subject, body):
+    """Queue a plain-text email for background delivery; returns immediately"""
+    if not current_app.config['MAIL_ENABLED']:
+        return
+    _ensure_workers()
+    _outbox.put(OutgoingEmail(to_email, subject, body))
+
+
+def wait_for_outbox(timeout=None):
+    """Block until every queued message has been attempted (for tests and shutdown)"""
+    deadline = None if timeout is None else time.monotonic() + timeout
+    with _outbox.all_tasks_done:
+        while _outbox.unfinished_tasks:
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            _outbox.all_tasks_done.wait(remaining)
+    return True
+
+
+def send_assignment_email(to_email, ticket_id, assignee_name):
     subject = f"You have been assigned Ticket #{ticket_id}"
     body = f"Hello {assignee_name},\n\nYou have been assigned to Ticket #{ticket_id}. Please check the portal for details.\n\nBest regards,\nSupport Team"
+    queue_email(to_email, subject, body)
 
-    msg = MIMEText(body)
-    msg['Subject'] = subject
-    msg['From'] = smtp_username
-    msg['To'] = to_email
 
-    with smtplib.SMTP(smtp_server, smtp_port) as server:
-        server.starttls()
-        server.login(smtp_username, smtp_password)
-        server.sendmail(smtp_username, [to_email], msg.as_string())
+def send_bulk_assignment_email(to_email, ticket_count, assignee_name):
+    subject = f"You have been assigned {ticket_count} tickets"
+    body = f"Hello {assignee_name},\n\nYou have been assigned {ticket_count} tickets. Please check the portal for details.\n\nBest regards,\nSupport Team"
+    queue_email(to_email, subject, body)
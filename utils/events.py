@@ -0,0 +1,215 @@
+import json
+import logging
+import os
+import queue
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from app import db
+from models import Ticket
+from utils.stats import get_ticket_stats, invalidate_ticket_stats, dashboard_counters, user_status_counts
+
+# Connected dashboards. One poller thread per worker watches tickets.updated_at
+# and fans changes out, so idle dashboards cost one indexed query per interval
+# per worker instead of a full page render per tab.
+_subscribers = set()
+_subscribers_lock = threading.Lock()
+_poller_pid = None
+_wake = threading.Event()
+
+# Commits can land slightly after the updated_at they stamped; re-scan this
+# window and skip rows that were already sent
+COMMIT_LAG = timedelta(seconds=5)
+MAX_EVENTS_PER_POLL = 200
+
+
+class Subscription:
+    """One connected dashboard and the events waiting to be streamed to it"""
+
+    def __init__(self, user_id, is_super_admin, max_pending=100):
+        self.user_id = user_id
+        self.is_super_admin = is_super_admin
+        self.events = queue.Queue(maxsize=max_pending)
+        self.overflowed = False
+
+    def push(self, event, data):
+        try:
+            self.events.put_nowait((event, data))
+        except queue.Full:
+            # A stalled client missed updates; tell it to reload instead
+            self.overflowed = True
+
+    def next_event(self, timeout):
+        """Next (event, data) pair, or None when the keepalive timeout passes"""
+        if self.overflowed:
+            return 'resync', {}
+        try:
+            return self.events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+def format_event(event, data):
+    """Encode one server-sent event"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def format_position(position):
+    """Encode the point a stream has got to
+
+    The browser reconnects with it as Last-Event-ID, and the page keeps it to
+    catch up after reopening a stream it closed while hidden.
+    """
+    return f"event: position\nid: {position.isoformat()}\ndata: {{}}\n\n"
+
+
+def parse_position(value):
+    """Last-Event-ID back to a datetime, or None when absent or not one of ours"""
+    try:
+        return datetime.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
+def _ticket_payload(ticket, since):
+    return {
+        'id': ticket.id,
+        'ticket_number': ticket.ticket_number,
+        'title': ticket.title,
+        'status': ticket.status,
+        'priority': ticket.priority,
+        'assignee': ticket.assignee.full_name if ticket.assignee else None,
+        'is_new': ticket.created_at is not None and ticket.created_at > since,
+        'updated_at': ticket.updated_at.isoformat(),
+    }
+
+
+def _user_counters(user_id):
+    counts = user_status_counts(user_id)
+    return {
+        'open_tickets': counts.get('Open', 0),
+        'in_progress_tickets': counts.get('In Progress', 0),
+        'resolved_tickets': counts.get('Resolved', 0),
+        'total_tickets': sum(counts.values()),
+    }
+
+
+def _poll_changes(watermark, sent):
+    """Find tickets changed since the watermark; returns (tickets, new_watermark)"""
+    since = watermark - COMMIT_LAG
+    tickets = (Ticket.query.options(db.joinedload(Ticket.assignee))
+               .filter(Ticket.updated_at > since)
+               .order_by(Ticket.updated_at)
+               .limit(MAX_EVENTS_PER_POLL).all())
+    changed = [ticket for ticket in tickets if sent.get(ticket.id) != ticket.updated_at]
+    for ticket in changed:
+        sent[ticket.id] = ticket.updated_at
+        watermark = max(watermark, ticket.updated_at)
+    for ticket_id, updated_at in list(sent.items()):
+        if updated_at <= watermark - COMMIT_LAG:
+            del sent[ticket_id]
+    return changed, since, watermark
+
+
+def _publish(changed, since):
+    with _subscribers_lock:
+        subscribers = list(_subscribers)
+    if not subscribers:
+        return
+
+    # Another worker may have made the change, so this worker's cache is stale
+    invalidate_ticket_stats()
+    payloads = [(ticket.user_id, _ticket_payload(ticket, since)) for ticket in changed]
+    admin_counters = None
+    user_counters = {}
+    for subscription in subscribers:
+        if subscription.is_super_admin:
+            if admin_counters is None:
+                admin_counters = dashboard_counters(get_ticket_stats())
+            subscription.push('tickets', {'tickets': [p for _, p in payloads], 'stats': admin_counters})
+            continue
+        own = [payload for owner, payload in payloads if owner == subscription.user_id]
+        if not own:
+            continue
+        if subscription.user_id not in user_counters:
+            user_counters[subscription.user_id] = _user_counters(subscription.user_id)
+        subscription.push('tickets', {'tickets': own, 'stats': user_counters[subscription.user_id]})
+
+
+def _poll_loop(app):
+    interval = app.config['SSE_POLL_INTERVAL']
+    watermark = datetime.utcnow()
+    sent = {}
+    while True:
+        _wake.wait(interval)
+        _wake.clear()
+        with _subscribers_lock:
+            idle = not _subscribers
+        if idle:
+            # Nobody is listening; don't replay the backlog to the next client
+            watermark = datetime.utcnow()
+            sent.clear()
+            continue
+        with app.app_context():
+            try:
+                changed, since, watermark = _poll_changes(watermark, sent)
+                if changed:
+                    _publish(changed, since)
+            except Exception as e:
+                logging.error(f"Error polling ticket changes: {e}")
+            finally:
+                db.session.remove()
+
+
+def _ensure_poller():
+    """Start the change poller lazily, once per process (gunicorn forks after import)"""
+    global _poller_pid
+    with _subscribers_lock:
+        if _poller_pid == os.getpid():
+            return
+        app = current_app._get_current_object()
+        poller = threading.Thread(target=_poll_loop, args=(app,), name='ticket-events', daemon=True)
+        poller.start()
+        _poller_pid = os.getpid()
+
+
+def subscribe(user_id, is_super_admin):
+    """Register a dashboard connection for ticket change events"""
+    _ensure_poller()
+    subscription = Subscription(user_id, is_super_admin)
+    with _subscribers_lock:
+        _subscribers.add(subscription)
+    return subscription
+
+
+def catch_up(subscription, position):
+    """Queue the changes made while the browser was reconnecting"""
+    # The poller publishes a change up to one interval after it was stamped
+    since = position - COMMIT_LAG - timedelta(seconds=current_app.config['SSE_POLL_INTERVAL'])
+    query = (Ticket.query.options(db.joinedload(Ticket.assignee))
+             .filter(Ticket.updated_at > since))
+    if not subscription.is_super_admin:
+        query = query.filter(Ticket.user_id == subscription.user_id)
+    tickets = query.order_by(Ticket.updated_at).limit(MAX_EVENTS_PER_POLL + 1).all()
+    if len(tickets) > MAX_EVENTS_PER_POLL:
+        subscription.overflowed = True
+        return
+    if not tickets:
+        return
+    if subscription.is_super_admin:
+        invalidate_ticket_stats()
+        stats = dashboard_counters(get_ticket_stats())
+    else:
+        stats = _user_counters(subscription.user_id)
+    subscription.push('tickets', {'tickets': [_ticket_payload(ticket, position) for ticket in tickets],
+                                  'stats': stats})
+
+
+def unsubscribe(subscription):
+    with _subscribers_lock:
+        _subscribers.discard(subscription)
+
+
+def notify_ticket_change():
+    """Poll now instead of waiting for the next interval (changes made in this worker)"""
+    _wake.set()
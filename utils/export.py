@@ -0,0 +1,149 @@
+import csv
+import io
+import json
+import tempfile
+from itertools import chain, islice
+from sqlalchemy.orm import Session
+from utils.timezone import utc_to_ist
+
+EXPORT_HEADERS = [
+    'Ticket ID', 'Title', 'Description', 'Category', 'Priority', 'Status',
+    'Created By', 'User Email', 'User Department', 'System Name', 'IP Address',
+    'Assigned To', 'Assigned By', 'Created Date', 'Updated Date', 'Resolved Date'
+]
+
+EXPORT_FORMATS = {
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+FETCH_CHUNK_SIZE = 1000     # rows pulled from the database per round trip
+WIDTH_SAMPLE_SIZE = 200     # rows inspected to size the Excel columns
+STREAM_CHUNK_SIZE = 64 * 1024
+MAX_COLUMN_WIDTH = 50
+
+
+def _format_ist(dt):
+    return utc_to_ist(dt).strftime('%Y-%m-%d %H:%M:%S') if dt else 'N/A'
+
+
+def ticket_export_row(ticket):
+    """Flatten a ticket into the values of one export row"""
+    user = ticket.user
+    return [
+        ticket.ticket_number,
+        ticket.title,
+        ticket.description,
+        ticket.category,
+        ticket.priority,
+        ticket.status,
+        ticket.user_name or (user.full_name if user else 'N/A'),
+        user.email if user else 'N/A',
+        (user.department if user else None) or 'N/A',
+        ticket.user_system_name or 'N/A',
+        ticket.user_ip_address or 'N/A',
+        ticket.assignee.full_name if ticket.assignee else 'Unassigned',
+        ticket.assigner.full_name if ticket.assigner else 'N/A',
+        _format_ist(ticket.created_at),
+        _format_ist(ticket.updated_at),
+        _format_ist(ticket.resolved_at),
+    ]
+
+
+def iter_ticket_rows(query, chunk_size=FETCH_CHUNK_SIZE):
+    """Yield export rows, fetching tickets from the database in chunks"""
+    # A session of its own: the request's scoped session is removed when the
+    # view returns, while a streamed body is still being read
+    session = Session(bind=query.session.get_bind())
+    try:
+        for ticket in query.with_session(session).yield_per(chunk_size):
+            yield ticket_export_row(ticket)
+    finally:
+        session.close()
+
+
+def sample_rows(rows, size=WIDTH_SAMPLE_SIZE):
+    """Split off the first rows for sizing; returns (sample, all_rows_iterator)"""
+    rows = iter(rows)
+    sample = list(islice(rows, size))
+    return sample, chain(sample, rows)
+
+
+def column_widths(sample, headers=EXPORT_HEADERS):
+    """Compute Excel column widths from the header and a sample of rows"""
+    widths = [len(header) for header in headers]
+    for row in sample:
+        for index, value in enumerate(row):
+            widths[index] = max(widths[index], len(str(value)) if value is not None else 0)
+    return [min(width + 2, MAX_COLUMN_WIDTH) for width in widths]
+
+
+def stream_xlsx(rows, widths, headers=EXPORT_HEADERS):
+    """Write rows with openpyxl's write-only mode and stream the file back in chunks"""
+    # Imported on first export: openpyxl is heavy and most workers never need it
+    import openpyxl
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font, PatternFill, Alignment
+    from openpyxl.utils import get_column_letter
+
+    wb = openpyxl.Workbook(write_only=True)
+    ws = wb.create_sheet("Tickets Report")
+    for index, width in enumerate(widths, 1):
+        ws.column_dimensions[get_column_letter(index)].width = width
+
+    header_font = Font(bold=True, color="FFFFFF")
+    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+    header_alignment = Alignment(horizontal="center", vertical="center")
+    header_cells = []
+    for header in headers:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.font = header_font
+        cell.fill = header_fill
+        cell.alignment = header_alignment
+        header_cells.append(cell)
+    ws.append(header_cells)
+
+    for row in rows:
+        ws.append(row)
+
+    # The zip container can only be finalised once all rows are written, so it
+    # is assembled in a disk-backed temp file rather than in worker memory
+    with tempfile.TemporaryFile() as tmp:
+        wb.save(tmp)
+        tmp.seek(0)
+        while True:
+            chunk = tmp.read(STREAM_CHUNK_SIZE)
+            if not chunk:
+                break
+            yield chunk
+
+
+def _buffered(lines, flush_every=500):
+    """Group generated text lines into larger chunks for the response"""
+    buffer = []
+    for line in lines:
+        buffer.append(line)
+        if len(buffer) >= flush_every:
+            yield ''.join(buffer).encode('utf-8')
+            buffer = []
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+
+
+def stream_csv(rows, headers=EXPORT_HEADERS):
+    """Stream rows as CSV"""
+    def lines():
+        out = io.StringIO()
+        writer = csv.writer(out)
+        for row in chain([headers], rows):
+            writer.writerow(row)
+            yield out.getvalue()
+            out.seek(0)
+            out.truncate(0)
+    return _buffered(lines())
+
+
+def stream_ndjson(rows, headers=EXPORT_HEADERS):
+    """Stream rows as newline-delimited JSON objects"""
+    return _buffered(json.dumps(dict(zip(headers, row)), ensure_ascii=False) + '\n' for row in rows)
@@ -0,0 +1,154 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from markupsafe import Markup
+
+_DISK_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS fragments (
+    key TEXT PRIMARY KEY,
+    html TEXT NOT NULL,
+    used_at REAL NOT NULL
+)
+'''
+_DISK_PRUNE_EVERY = 200  # stores between checks of the disk entry bound
+
+
+class FragmentCache:
+    """Rendered HTML by key: an LRU per process, backed by an optional SQLite
+    file shared by every worker on the host
+
+    Entries are never invalidated; keys include everything the HTML depends on.
+    """
+
+    def __init__(self, max_entries=5000, path='', max_disk_entries=100000):
+        self.max_entries = max_entries
+        self.path = path
+        self.max_disk_entries = max_disk_entries
+        self._memory = OrderedDict()  # key -> html, least recently used first
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        self._connection = None
+        self._connection_pid = None
+        self._stores = 0
+
+    def _disk(self):
+        # Opened lazily and per process: gunicorn forks workers after import
+        if self._connection is None or self._connection_pid != os.getpid():
+            self._connection = sqlite3.connect(self.path, timeout=1, check_same_thread=False,
+                                               isolation_level=None)
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute('PRAGMA synchronous=NORMAL')
+            self._connection.execute(_DISK_SCHEMA)
+            self._connection_pid = os.getpid()
+        return self._connection
+
+    def get_many(self, keys):
+        """Cached HTML for whichever keys are present"""
+        found = {}
+        with self._lock:
+            for key in keys:
+                html = self._memory.get(key)
+                if html is not None:
+                    self._memory.move_to_end(key)
+                    found[key] = html
+        missing = [key for key in keys if key not in found]
+        if self.path and missing:
+            from_disk = self._disk_get(missing)
+            if from_disk:
+                found.update(from_disk)
+                self._remember(from_disk)
+        return found
+
+    def set_many(self, items):
+        """Store freshly rendered HTML for each key"""
+        if not items:
+            return
+        self._remember(items)
+        if self.path:
+            self._disk_set(items)
+
+    def _remember(self, items):
+        with self._lock:
+            for key, html in items.items():
+                self._memory[key] = html
+                self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _disk_get(self, keys):
+        placeholders = ','.join('?' * len(keys))
+        try:
+            with self._disk_lock:
+                connection = self._disk()
+                rows = connection.execute(f'SELECT key, html FROM fragments WHERE key IN ({placeholders})',
+                                          keys).fetchall()
+                if rows:
+                    # Recency for the shared LRU; one statement per page
+                    connection.execute(f'UPDATE fragments SET used_at = ? WHERE key IN ({placeholders})',
+                                       [time.time(), *keys])
+        except sqlite3.Error as e:
+            logging.warning(f"Fragment cache read failed: {e}")
+            return {}
+        return dict(rows)
+
+    def _disk_set(self, items):
+        now = time.time()
+        try:
+            with self._disk_lock:
+                connection = self._disk()
+                connection.executemany('INSERT OR REPLACE INTO fragments (key, html, used_at) VALUES (?, ?, ?)',
+                                       [(key, html, now) for key, html in items.items()])
+                self._stores += len(items)
+                if self._stores >= _DISK_PRUNE_EVERY:
+                    self._stores = 0
+                    excess = connection.execute('SELECT COUNT(*) FROM fragments').fetchone()[0] - self.max_disk_entries
+                    if excess > 0:
+                        connection.execute('DELETE FROM fragments WHERE key IN '
+                                           '(SELECT key FROM fragments ORDER BY used_at LIMIT ?)', (excess,))
+        except sqlite3.Error as e:
+            logging.warning(f"Fragment cache write failed: {e}")
+
+
+def _fragment_key(source_hash, ticket):
+    # updated_at changes with every ticket edit; comment counters change without
+    # one, and the assignee's name lives in another table, so both are in the key
+    assignee = ticket.assignee.full_name if ticket.assigned_to and ticket.assignee else ''
+    version = ticket.updated_at.isoformat() if ticket.updated_at else ''
+    return (f'{source_hash}:{ticket.id}:{version}:{ticket.comment_count}:'
+            f'{hashlib.sha1(assignee.encode()).hexdigest()[:8]}')
+
+
+def init_fragments(app):
+    """ticket_fragments() for templates: per-ticket HTML rendered once per ticket version"""
+    cache = FragmentCache(app.config['FRAGMENT_CACHE_SIZE'], app.config['FRAGMENT_CACHE_PATH'],
+                          app.config['FRAGMENT_CACHE_DISK_ENTRIES'])
+    source_hashes = {}
+
+    def source_hash(name):
+        # The template's own source is the "variant": editing it retires old entries
+        if name not in source_hashes or app.debug:
+            source = app.jinja_env.loader.get_source(app.jinja_env, name)[0]
+            source_hashes[name] = hashlib.sha1(f'{name}\n{source}'.encode()).hexdigest()[:12]
+        return source_hashes[name]
+
+    def ticket_fragments(template_name, tickets):
+        """Each ticket rendered with template_name, which sees only `ticket`"""
+        tickets = list(tickets)
+        template = app.jinja_env.get_template(template_name)
+        if not app.config['FRAGMENT_CACHE_ENABLED']:
+            return [Markup(template.render(ticket=ticket)) for ticket in tickets]
+        prefix = source_hash(template_name)
+        keys = [_fragment_key(prefix, ticket) for ticket in tickets]
+        cached = cache.get_many(keys)
+        rendered = {}
+        for key, ticket in zip(keys, tickets):
+            if key not in cached and key not in rendered:
+                rendered[key] = template.render(ticket=ticket)
+        cache.set_many(rendered)
+        return [Markup(cached[key] if key in cached else rendered[key]) for key in keys]
+
+    app.jinja_env.globals['ticket_fragments'] = ticket_fragments
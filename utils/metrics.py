@@ -0,0 +1,243 @@
+import glob
+import hmac
+import json
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from flask import Response, abort, g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import QueuePool
+
+# name -> (type, help text, histogram bucket upper bounds)
+METRICS = {
+    'http_requests_total': ('counter', 'Requests served, by endpoint, method and status', None),
+    'http_request_duration_seconds': ('histogram', 'Time from request start until the response body was sent',
+                                      (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)),
+    'db_queries_per_request': ('histogram', 'SQL statements executed while handling one request',
+                               (0, 1, 2, 3, 5, 10, 20, 50, 100)),
+    'db_pool_checkout_wait_seconds': ('histogram', 'Time spent waiting for a pooled database connection',
+                                      (0.0001, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5)),
+    'db_pool_checked_out': ('gauge', 'Database connections currently checked out of the pool', None),
+    'db_pool_overflow': ('gauge', 'Connections open beyond pool_size (negative: pool not yet full)', None),
+    'db_pool_size': ('gauge', 'Configured connection pool size', None),
+    'export_bytes_total': ('counter', 'Bytes streamed by report exports, by format', None),
+    'upload_bytes_total': ('counter', 'Bytes received in file uploads', None),
+    'upload_stored_bytes_total': ('counter', 'Bytes of uploads written as new blobs (after de-duplication)', None),
+}
+
+LOCAL_ADDRESSES = ('127.0.0.1', '::1')
+
+_lock = threading.Lock()
+_counters = {}    # (name, labels) -> value
+_histograms = {}  # (name, labels) -> [count per bucket..., +Inf count, sum]
+_last_dump = 0.0
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+
+def inc(name, value=1, **labels):
+    """Add to a counter"""
+    key = (name, _labels(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(name, value, **labels):
+    """Record one value in a histogram"""
+    buckets = METRICS[name][2]
+    key = (name, _labels(labels))
+    index = bisect_left(buckets, value)
+    with _lock:
+        series = _histograms.get(key)
+        if series is None:
+            series = _histograms[key] = [0] * (len(buckets) + 2)
+        series[index] += 1
+        series[-1] += value
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            observe('db_pool_checkout_wait_seconds', time.perf_counter() - start)
+
+
+# SQLAlchemy names a pool's logger after its class, which puts this one outside
+# the "sqlalchemy" logger it keeps at WARN; keep it as quiet as QueuePool is
+logging.getLogger(f'{__name__}.{TimedQueuePool.__name__}').setLevel(logging.WARNING)
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and '_metrics' in g:
+        g._metrics['queries'] += 1
+
+
+def count_bytes(chunks, name, **labels):
+    """Pass a streamed body through, adding its size to a byte counter as it is sent"""
+    for chunk in chunks:
+        inc(name, len(chunk), **labels)
+        yield chunk
+
+
+def _pool_gauges(engine):
+    pool = engine.pool
+    if not isinstance(pool, QueuePool):
+        return {}
+    return {
+        ('db_pool_checked_out', ()): pool.checkedout(),
+        ('db_pool_overflow', ()): pool.overflow(),
+        ('db_pool_size', ()): pool.size(),
+    }
+
+
+def _snapshot(engine):
+    with _lock:
+        counters = dict(_counters)
+        histograms = {key: list(series) for key, series in _histograms.items()}
+    return counters, histograms, _pool_gauges(engine)
+
+
+def _encode(series):
+    return [[name, list(labels), value] for (name, labels), value in series.items()]
+
+
+def _decode(items):
+    return {(name, tuple(tuple(pair) for pair in labels)): value for name, labels, value in items}
+
+
+def _dump(directory, engine):
+    """Write this process's metrics where the other workers' /metrics can read them"""
+    counters, histograms, gauges = _snapshot(engine)
+    path = os.path.join(directory, f'metrics-{os.getpid()}.json')
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump({'pid': os.getpid(), 'counters': _encode(counters),
+                   'histograms': _encode(histograms), 'gauges': _encode(gauges)}, f)
+    os.replace(tmp_path, path)
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _aggregate(directory, engine):
+    """Sum every worker's dump; gauges only count workers that are still running"""
+    _dump(directory, engine)
+    counters, histograms, gauges = {}, {}, {}
+    for path in glob.glob(os.path.join(directory, 'metrics-*.json')):
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for key, value in _decode(data['counters']).items():
+            counters[key] = counters.get(key, 0) + value
+        for key, series in _decode(data['histograms']).items():
+            total = histograms.setdefault(key, [0] * len(series))
+            for index, value in enumerate(series):
+                total[index] += value
+        if _pid_alive(data['pid']):
+            for key, value in _decode(data['gauges']).items():
+                gauges[key] = gauges.get(key, 0) + value
+    return counters, histograms, gauges
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+def render(counters, histograms, gauges):
+    """Prometheus text exposition format"""
+    lines = []
+    for name, (kind, help_text, buckets) in METRICS.items():
+        source = {'counter': counters, 'gauge': gauges, 'histogram': histograms}[kind]
+        series = sorted((labels, value) for (metric, labels), value in source.items() if metric == name)
+        if not series:
+            continue
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for labels, value in series:
+            if kind != 'histogram':
+                lines.append(f'{name}{_format_labels(labels)} {value}')
+                continue
+            cumulative = 0
+            for bound, count in zip(list(buckets) + ['+Inf'], value[:-1]):
+                cumulative += count
+                lines.append(f'{name}_bucket{_format_labels(labels, [("le", bound)])} {cumulative}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {value[-1]}')
+            lines.append(f'{name}_count{_format_labels(labels)} {cumulative}')
+    return '\n'.join(lines) + '\n'
+
+
+def init_metrics(app, db):
+    """Time every request and serve /metrics"""
+    directory = app.config['METRICS_DIR']
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    @app.before_request
+    def _start_timer():
+        # A dict, so queries run while a streamed body is generated still count
+        g._metrics = {'start': time.perf_counter(), 'queries': 0}
+
+    @app.after_request
+    def _record_request(response):
+        timing = g.get('_metrics')
+        if timing is None:
+            return response
+        endpoint = request.endpoint or 'unmatched'
+        method = request.method
+
+        def record():
+            # Runs when the body has been sent, so streamed responses are timed in full
+            global _last_dump
+            status = str(response.status_code)
+            inc('http_requests_total', endpoint=endpoint, method=method, status=status)
+            observe('http_request_duration_seconds', time.perf_counter() - timing['start'], endpoint=endpoint)
+            observe('db_queries_per_request', timing['queries'], endpoint=endpoint)
+            if directory and time.monotonic() - _last_dump >= app.config['METRICS_FLUSH_INTERVAL']:
+                _last_dump = time.monotonic()
+                try:
+                    with app.app_context():
+                        _dump(directory, db.engine)
+                except OSError as e:
+                    logging.warning(f"Could not write metrics to {directory}: {e}")
+
+        response.call_on_close(record)
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        """Prometheus scrape endpoint"""
+        token = app.config['METRICS_TOKEN']
+        if token:
+            if not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+                abort(401)
+        elif request.remote_addr not in LOCAL_ADDRESSES:
+            # Without a token only a scraper on this host may read it
+            abort(404)
+        if directory:
+            data = _aggregate(directory, db.engine)
+        else:
+            data = _snapshot(db.engine)
+        return Response(render(*data), mimetype='text/plain; version=0.0.4')
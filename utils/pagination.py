@@ -0,0 +1,98 @@
+import base64
+from datetime import datetime
+from flask import request, url_for
+from sqlalchemy import tuple_
+
+
+class KeysetPage:
+    """One page of a (created_at, id) keyset-paginated listing"""
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None, param='cursor'):
+        self.items = items
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.param = param
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    @property
+    def next_url(self):
+        return _page_url(self.param, 'next', self.next_cursor) if self.has_next else None
+
+    @property
+    def prev_url(self):
+        return _page_url(self.param, 'prev', self.prev_cursor) if self.has_prev else None
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __bool__(self):
+        return bool(self.items)
+
+
+def encode_cursor(row):
+    """Encode a row's (created_at, id) position as an opaque URL-safe token"""
+    raw = f"{row.created_at.isoformat()}|{row.id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Decode a cursor token; returns (created_at, id) or None if it is malformed"""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode()
+        created_at, row_id = raw.split('|', 1)
+        return datetime.fromisoformat(created_at), int(row_id)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def _page_url(param, direction, cursor):
+    """Current URL with every other query argument (filters) kept and the cursor swapped"""
+    args = request.args.to_dict()
+    args.pop(f'{param}_next', None)
+    args.pop(f'{param}_prev', None)
+    args[f'{param}_{direction}'] = cursor
+    return url_for(request.endpoint, **(request.view_args or {}), **args)
+
+
+def keyset_paginate(query, model, per_page=25, param='cursor'):
+    """Return a KeysetPage of `query`, newest first, positioned by the cursor in the request
+
+    The cursor arrives as ?<param>_next=... (older rows) or ?<param>_prev=...
+    (newer rows). Each page is an index range scan on (created_at, id), so page
+    500 costs the same as page 1.
+    """
+    key = tuple_(model.created_at, model.id)
+    after = decode_cursor(request.args.get(f'{param}_next'))
+    before = decode_cursor(request.args.get(f'{param}_prev'))
+
+    if before and not after:
+        rows = (query.filter(key > tuple_(*before))
+                .order_by(model.created_at.asc(), model.id.asc())
+                .limit(per_page + 1).all())
+        has_more = len(rows) > per_page
+        items = list(reversed(rows[:per_page]))
+        next_cursor = encode_cursor(items[-1]) if items else None
+        prev_cursor = encode_cursor(items[0]) if items and has_more else None
+    else:
+        if after:
+            query = query.filter(key < tuple_(*after))
+        rows = (query.order_by(model.created_at.desc(), model.id.desc())
+                .limit(per_page + 1).all())
+        has_more = len(rows) > per_page
+        items = rows[:per_page]
+        next_cursor = encode_cursor(items[-1]) if items and has_more else None
+        prev_cursor = encode_cursor(items[0]) if items and after else None
+
+    return KeysetPage(items, next_cursor, prev_cursor, param)
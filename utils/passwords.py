@@ -0,0 +1,66 @@
+import threading
+from contextlib import contextmanager
+from flask import current_app
+from werkzeug.security import check_password_hash, generate_password_hash
+
+# PASSWORD_HASH_METHOD -> the "method:params" prefix werkzeug writes for it
+_method_prefixes = {}
+
+_slots = None
+_slots_lock = threading.Lock()
+
+
+class HashBusy(Exception):
+    """Too many password hashes already running; the caller should ask the client to retry"""
+
+
+def hash_password(password):
+    """Hash a password with the configured method and cost parameters
+
+    Shares verify_password's concurrency limit; raises HashBusy on timeout.
+    """
+    with _hash_slot():
+        return generate_password_hash(password, method=current_app.config['PASSWORD_HASH_METHOD'])
+
+
+def _method_prefix(method):
+    # "scrypt" and "scrypt:32768:8:1" are the same thing; ask werkzeug once per
+    # process which prefix it writes rather than hard-coding its defaults
+    if method not in _method_prefixes:
+        _method_prefixes[method] = generate_password_hash('', method=method).split('$', 1)[0]
+    return _method_prefixes[method]
+
+
+def needs_rehash(password_hash):
+    """True when a stored hash was made with other parameters than the configured ones"""
+    return password_hash.split('$', 1)[0] != _method_prefix(current_app.config['PASSWORD_HASH_METHOD'])
+
+
+def _hash_slots():
+    global _slots
+    with _slots_lock:
+        if _slots is None:
+            _slots = threading.BoundedSemaphore(current_app.config['PASSWORD_HASH_CONCURRENCY'])
+        return _slots
+
+
+@contextmanager
+def _hash_slot():
+    slots = _hash_slots()
+    if not slots.acquire(timeout=current_app.config['PASSWORD_HASH_TIMEOUT']):
+        raise HashBusy()
+    try:
+        yield
+    finally:
+        slots.release()
+
+
+def verify_password(password_hash, password):
+    """check_password_hash with at most PASSWORD_HASH_CONCURRENCY hashes running per process
+
+    scrypt and PBKDF2 release the GIL, so a few run in parallel on threaded
+    workers; beyond that a login burst queues here for up to
+    PASSWORD_HASH_TIMEOUT seconds, then gets HashBusy instead of piling up.
+    """
+    with _hash_slot():
+        return check_password_hash(password_hash, password)
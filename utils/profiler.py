@@ -0,0 +1,123 @@
+import json
+import logging
+import os
+import re
+import sys
+import time
+from collections import Counter
+from flask import g, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Structured slow-query records go to their own logger so they can be routed separately
+slow_log = logging.getLogger('sql.slow')
+
+_WHITESPACE = re.compile(r'\s+')
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _shape(statement):
+    # Statements are already parameterised, so the text is the shape
+    return _WHITESPACE.sub(' ', statement).strip()
+
+
+def _caller():
+    """Innermost application frame (Python or template) that triggered a statement"""
+    frame = sys._getframe(2)
+    while frame:
+        filename = frame.f_code.co_filename
+        if filename.startswith(_ROOT) and not filename.endswith(('profiler.py', 'metrics.py')) \
+                and '/site-packages/' not in filename:
+            return f'{os.path.relpath(filename, _ROOT)}:{frame.f_lineno}'
+        frame = frame.f_back
+    return None
+
+
+class RequestProfile:
+    """Statements run while handling one request"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.shapes = Counter()
+        self.repeat_callers = {}
+
+    def record(self, statement, seconds, threshold):
+        shape = _shape(statement)
+        self.count += 1
+        self.seconds += seconds
+        self.shapes[shape] += 1
+        if self.shapes[shape] == threshold:
+            # Only pay for a stack walk once a shape looks like an N+1
+            self.repeat_callers[shape] = _caller()
+
+    def repeats(self, threshold):
+        return [(shape, count, self.repeat_callers.get(shape))
+                for shape, count in self.shapes.most_common() if count >= threshold]
+
+
+def init_profiler(app):
+    """Per-request SQL profiling and N+1 detection (SQL_PROFILER) and the slow-query log (SQL_SLOW_QUERY_MS)"""
+    profiling = app.config['SQL_PROFILER']
+    slow_ms = app.config['SQL_SLOW_QUERY_MS']
+    threshold = app.config['SQL_N_PLUS_ONE_THRESHOLD']
+    if not profiling and not slow_ms:
+        return
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def _start_statement(conn, cursor, statement, parameters, context, executemany):
+        # Kept on the statement's own execution context: a statement that fails
+        # never reaches after_cursor_execute, and its start is discarded with it
+        if context is not None:
+            context._profiler_start = time.perf_counter()
+
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def _end_statement(conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, '_profiler_start', None)
+        if start is None:
+            return
+        seconds = time.perf_counter() - start
+        in_request = has_request_context()
+        if profiling and in_request and '_sql_profile' in g:
+            g._sql_profile.record(statement, seconds, threshold)
+        if slow_ms and seconds * 1000 >= slow_ms:
+            slow_log.warning(json.dumps({
+                'event': 'slow_query',
+                'ms': round(seconds * 1000, 1),
+                'endpoint': request.endpoint if in_request else None,
+                'method': request.method if in_request else None,
+                'path': request.path if in_request else None,
+                'caller': _caller(),
+                'statement': _shape(statement),
+            }))
+
+    if not profiling:
+        return
+
+    @app.before_request
+    def _start_profile():
+        g._sql_profile = RequestProfile()
+
+    @app.after_request
+    def _report_profile(response):
+        profile = g.get('_sql_profile')
+        if profile is None:
+            return response
+        # Queries so far; streamed bodies may run more, which the log line includes
+        response.headers['Server-Timing'] = f'db;dur={profile.seconds * 1000:.1f};desc="{profile.count} queries"'
+        endpoint = request.endpoint
+        method = request.method
+        path = request.full_path.rstrip('?')
+
+        def log_profile():
+            repeats = profile.repeats(threshold)
+            summary = f"SQL {method} {path} endpoint={endpoint} queries={profile.count} db_ms={profile.seconds * 1000:.1f}"
+            if not repeats:
+                logging.info(summary)
+                return
+            logging.warning(f"{summary} possible N+1: {len(repeats)} statement(s) repeated {threshold}+ times")
+            for shape, count, caller in repeats:
+                logging.warning(f"  x{count} from {caller or 'unknown'}: {shape[:300]}")
+
+        response.call_on_close(log_profile)
+        return response
@@ -0,0 +1,55 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class TokenBucketLimiter:
+    """In-memory token buckets per key: rate tokens per minute, up to burst saved up
+
+    State is per process, so with N workers the effective limit is up to N
+    times higher; enough to stop a burst from one source burning CPU.
+    """
+
+    def __init__(self, rate_per_minute, burst, max_keys=10000):
+        self.rate = rate_per_minute / 60.0
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> (tokens, updated_at), least recently used first
+        self._lock = threading.Lock()
+
+    def _tokens(self, key, now):
+        tokens, updated_at = self._buckets.get(key, (self.burst, now))
+        return min(self.burst, tokens + (now - updated_at) * self.rate)
+
+    def check(self, key, now=None):
+        """Seconds until key has a token, without taking one; 0 if it has one now"""
+        if not self.rate:
+            return 0
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens = self._tokens(key, now)
+        return 0 if tokens >= 1 else (1 - tokens) / self.rate
+
+    def allow(self, key, now=None):
+        """Take a token for key; returns (allowed, seconds until the next token)
+
+        A rate of 0 disables the limiter.
+        """
+        if not self.rate:
+            return True, 0
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens = self._tokens(key, now)
+            allowed = tokens >= 1
+            if allowed:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                # The least recently seen key has refilled the longest
+                self._buckets.popitem(last=False)
+        return allowed, 0 if allowed else (1 - tokens) / self.rate
+
+    def reset(self, key):
+        with self._lock:
+            self._buckets.pop(key, None)
@@ -0,0 +1,131 @@
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from flask import current_app, g, has_request_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event, text
+
+# Seconds the replica is behind the primary; 0 when it has replayed everything it received
+_POSTGRES_LAG = text(
+    "SELECT CASE WHEN NOT pg_is_in_recovery() THEN 0"
+    " WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0"
+    " ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+def parse_route_lags(value):
+    """'endpoint=seconds,...' -> {endpoint: max replica lag in seconds}"""
+    lags = {}
+    for item in value.split(','):
+        if item.strip():
+            endpoint, _, seconds = item.partition('=')
+            lags[endpoint.strip()] = float(seconds)
+    return lags
+
+
+class ReplicaLag:
+    """Replica lag measured at most once per interval per process; None while unreachable"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checked_at = None
+        self._lag = None
+
+    def current(self, engine, interval):
+        with self._lock:
+            if self._checked_at is not None and time.monotonic() - self._checked_at < interval:
+                return self._lag
+            # Claim the check so concurrent requests use the previous value meanwhile
+            self._checked_at = time.monotonic()
+        try:
+            with engine.connect() as connection:
+                if engine.dialect.name == 'postgresql':
+                    lag = float(connection.execute(_POSTGRES_LAG).scalar())
+                else:
+                    # No replication status to read; only check the replica answers
+                    connection.execute(text('SELECT 1'))
+                    lag = 0.0
+        except Exception as e:
+            logging.warning(f"Read replica unavailable, using the primary: {e}")
+            lag = None
+        with self._lock:
+            self._lag = lag
+        return lag
+
+
+_replica_lag = ReplicaLag()
+
+
+class RoutingSession(Session):
+    """Session that sends SELECTs to the read replica during replica routes
+
+    Writes, and every statement after the session's first write, use the primary.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and not self.info.get('wrote')
+                and (clause is None or getattr(clause, 'is_select', False))):
+            engine = _request_replica(self._db)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _request_replica(db):
+    """Replica engine for this request, or None to use the primary"""
+    if not has_request_context() or g.get('_replica_paused'):
+        return None
+    if '_replica' not in g:
+        g._replica = _choose_replica(db)
+    return g._replica
+
+
+def _choose_replica(db):
+    config = current_app.config
+    max_lag = config['REPLICA_ROUTES'].get(request.endpoint)
+    engine = db.engines.get('replica')
+    if max_lag is None or engine is None:
+        return None
+    lag = _replica_lag.current(engine, config['REPLICA_LAG_CHECK_INTERVAL'])
+    if lag is None or lag > max_lag:
+        return None
+    # Read your own writes: stay on the primary until the replica has caught up
+    # with this browser session's last write
+    last_write = session.get('_last_write')
+    if last_write and time.time() - last_write <= lag + config['REPLICA_WRITE_MARGIN']:
+        return None
+    return engine
+
+
+@contextmanager
+def use_primary():
+    """Run the enclosed queries on the primary even in a replica route"""
+    paused = g.get('_replica_paused', False)
+    g._replica_paused = True
+    try:
+        yield
+    finally:
+        g._replica_paused = paused
+
+
+def _mark_write(db_session):
+    db_session.info['wrote'] = True
+    if has_request_context():
+        session['_last_write'] = time.time()
+
+
+def init_replica(app, db):
+    """Record writes so later reads stay on the primary; no-op without a replica bind"""
+    if 'replica' not in app.config.get('SQLALCHEMY_BINDS', {}):
+        return
+
+    @event.listens_for(RoutingSession, 'after_flush')
+    def _after_flush(db_session, flush_context):
+        _mark_write(db_session)
+
+    @event.listens_for(RoutingSession, 'do_orm_execute')
+    def _orm_execute(orm_execute_state):
+        # Core-style UPDATE/INSERT/DELETE through the session skip the flush
+        if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+            _mark_write(orm_execute_state.session)
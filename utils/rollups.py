@@ -0,0 +1,281 @@
+import logging
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import event, func, inspect, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+from app import app, db
+from models import Ticket, TicketDailyStat
+from utils.timezone import utc_to_ist
+
+# Upper bounds (seconds) of the time-to-resolve histogram columns
+RESOLVE_BUCKETS = [
+    ('resolve_le_1h', 3600),
+    ('resolve_le_4h', 4 * 3600),
+    ('resolve_le_1d', 24 * 3600),
+    ('resolve_le_3d', 3 * 24 * 3600),
+    ('resolve_le_7d', 7 * 24 * 3600),
+    ('resolve_le_30d', 30 * 24 * 3600),
+    ('resolve_gt_30d', None),
+]
+OPEN_STATUSES = ('Open', 'In Progress')
+COUNTER_COLUMNS = ['created', 'entered', 'exited', 'resolve_seconds'] + [name for name, _ in RESOLVE_BUCKETS]
+
+_table = TicketDailyStat.__table__
+_key_columns = ['day', 'category', 'priority', 'status']
+
+
+def _day(dt):
+    """IST calendar day of a UTC timestamp"""
+    return utc_to_ist(dt or datetime.utcnow()).date()
+
+
+def _resolve_bucket(seconds):
+    for name, bound in RESOLVE_BUCKETS:
+        if bound is None or seconds <= bound:
+            return name
+
+
+class RollupDeltas:
+    """Counter increments per (day, category, priority, status) row"""
+
+    def __init__(self):
+        self.rows = defaultdict(Counter)
+
+    def __bool__(self):
+        return bool(self.rows)
+
+    def created(self, when, category, priority):
+        row = self.rows[(_day(when), category, priority, 'Open')]
+        row['created'] += 1
+        row['entered'] += 1
+
+    def moved(self, when, category, priority, old_status, new_status, created_at=None, resolved_at=None):
+        day = _day(when)
+        if old_status:
+            self.rows[(day, category, priority, old_status)]['exited'] += 1
+        if new_status:
+            row = self.rows[(day, category, priority, new_status)]
+            row['entered'] += 1
+            if new_status == 'Resolved' and created_at:
+                seconds = max(((resolved_at or when) - created_at).total_seconds(), 0)
+                row['resolve_seconds'] += seconds
+                row[_resolve_bucket(seconds)] += 1
+
+    def merge(self, other):
+        for key, counts in other.rows.items():
+            self.rows[key].update(counts)
+
+
+def apply_rollup_deltas(connection, deltas):
+    """Add the deltas to the rollup table, as one multi-row upsert where supported"""
+    rows = []
+    for (day, category, priority, status), counts in deltas.rows.items():
+        if not any(counts.values()):
+            continue
+        row = {column: counts[column] for column in COUNTER_COLUMNS}
+        row.update(day=day, category=category, priority=priority, status=status)
+        rows.append(row)
+    if not rows:
+        return
+    dialect = connection.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        insert = (pg_insert if dialect == 'postgresql' else sqlite_insert)(_table)
+        statement = insert.on_conflict_do_update(
+            index_elements=_key_columns,
+            set_={column: _table.c[column] + insert.excluded[column] for column in COUNTER_COLUMNS},
+        )
+        connection.execute(statement, rows)
+    else:
+        for row in rows:
+            result = connection.execute(
+                update(_table)
+                .where(*[_table.c[column] == row[column] for column in _key_columns])
+                .values({column: _table.c[column] + row[column] for column in COUNTER_COLUMNS})
+            )
+            if not result.rowcount:
+                connection.execute(_table.insert().values(**row))
+
+
+def _history(state, attribute):
+    """(old, new) values of a changed attribute, or None when unchanged"""
+    history = state.attrs[attribute].history
+    if not history.has_changes():
+        return None
+    old = history.deleted[0] if history.deleted else None
+    new = history.added[0] if history.added else None
+    return old, new
+
+
+@event.listens_for(Session, 'before_flush')
+def _collect_ticket_changes(session, flush_context, instances):
+    """Turn ticket inserts and status/category/priority changes into rollup deltas"""
+    deltas = RollupDeltas()
+    now = datetime.utcnow()
+    for ticket in session.new:
+        if isinstance(ticket, Ticket):
+            deltas.created(ticket.created_at or now, ticket.category, ticket.priority)
+            if ticket.status and ticket.status != 'Open':
+                deltas.moved(now, ticket.category, ticket.priority, 'Open', ticket.status,
+                             ticket.created_at or now, ticket.resolved_at)
+    for ticket in session.dirty:
+        if not isinstance(ticket, Ticket):
+            continue
+        state = inspect(ticket)
+        status = _history(state, 'status')
+        category = _history(state, 'category')
+        priority = _history(state, 'priority')
+        if not (status or category or priority):
+            continue
+        old_status, new_status = status or (ticket.status, ticket.status)
+        old_category = category[0] if category else ticket.category
+        old_priority = priority[0] if priority else ticket.priority
+        if (old_category, old_priority) == (ticket.category, ticket.priority):
+            deltas.moved(now, ticket.category, ticket.priority, old_status, new_status,
+                         ticket.created_at, ticket.resolved_at)
+        else:
+            # Re-classified: the ticket leaves one row and joins another. Only
+            # a real status change counts as a resolution
+            deltas.moved(now, old_category, old_priority, old_status, None)
+            deltas.moved(now, ticket.category, ticket.priority, None, new_status,
+                         ticket.created_at if status else None, ticket.resolved_at)
+    for ticket in session.deleted:
+        if isinstance(ticket, Ticket):
+            deltas.moved(now, ticket.category, ticket.priority, ticket.status, None)
+    if deltas:
+        session.info.setdefault('rollup_deltas', RollupDeltas()).merge(deltas)
+
+
+@event.listens_for(Session, 'after_flush')
+def _write_ticket_changes(session, flush_context):
+    """Apply collected deltas inside the flush's transaction, so they commit or roll back with it"""
+    deltas = session.info.pop('rollup_deltas', None)
+    if deltas:
+        apply_rollup_deltas(session.connection(), deltas)
+
+
+def rebuild_rollups(chunk_size=1000):
+    """Recompute the rollup table from the tickets table
+
+    Only creation, current status and resolved_at are stored on tickets, so
+    history is reconstructed as Open -> (Resolved at resolved_at) -> current
+    status at updated_at. Incremental maintenance records every real move.
+    """
+    deltas = RollupDeltas()
+    columns = (Ticket.category, Ticket.priority, Ticket.status,
+               Ticket.created_at, Ticket.updated_at, Ticket.resolved_at)
+    total = 0
+    for category, priority, status, created_at, updated_at, resolved_at in \
+            db.session.query(*columns).yield_per(chunk_size):
+        total += 1
+        created_at = created_at or updated_at
+        deltas.created(created_at, category, priority)
+        current = 'Open'
+        if resolved_at and status in ('Resolved', 'Closed'):
+            deltas.moved(resolved_at, category, priority, current, 'Resolved', created_at, resolved_at)
+            current = 'Resolved'
+        if status != current:
+            deltas.moved(updated_at or created_at, category, priority, current, status, created_at, updated_at)
+
+    db.session.query(TicketDailyStat).delete(synchronize_session=False)
+    apply_rollup_deltas(db.session.connection(), deltas)
+    db.session.commit()
+    return total
+
+
+def _percentile(buckets, total, fraction):
+    """Estimate a percentile from histogram counts by interpolating within its bucket"""
+    if not total:
+        return None
+    target = total * fraction
+    seen = 0
+    lower = 0
+    for name, bound in RESOLVE_BUCKETS:
+        count = buckets[name]
+        if count and seen + count >= target:
+            if bound is None:
+                return lower
+            return lower + (bound - lower) * (target - seen) / count
+        seen += count
+        lower = bound or lower
+    return lower
+
+
+def _period_start(day, by):
+    return day.replace(day=1) if by == 'month' else day
+
+
+def get_trends(start, end, by='month', category=None, priority=None):
+    """Opened/resolved counts, backlog and time-to-resolve per period from the rollups
+
+    Reads at most one row per day and status in [start, end), plus one
+    aggregate for the backlog before start.
+    """
+    filters = []
+    if category:
+        filters.append(TicketDailyStat.category == category)
+    if priority:
+        filters.append(TicketDailyStat.priority == priority)
+
+    backlog = (db.session.query(func.coalesce(func.sum(TicketDailyStat.entered - TicketDailyStat.exited), 0))
+               .filter(TicketDailyStat.day < start, TicketDailyStat.status.in_(OPEN_STATUSES), *filters)
+               .scalar())
+
+    sums = [func.sum(getattr(TicketDailyStat, column)) for column in COUNTER_COLUMNS]
+    rows = (db.session.query(TicketDailyStat.day, TicketDailyStat.status, *sums)
+            .filter(TicketDailyStat.day >= start, TicketDailyStat.day < end, *filters)
+            .group_by(TicketDailyStat.day, TicketDailyStat.status)
+            .order_by(TicketDailyStat.day)
+            .all())
+
+    periods = {}
+    period = _period_start(start, by)
+    while period < end:
+        periods[period] = {'opened': 0, 'net': 0, 'resolve_seconds': 0.0,
+                           'buckets': Counter()}
+        period = (period + timedelta(days=32)).replace(day=1) if by == 'month' else period + timedelta(days=1)
+
+    for row in rows:
+        counts = dict(zip(COUNTER_COLUMNS, row[2:]))
+        bucket = periods[_period_start(row.day, by)]
+        bucket['opened'] += counts['created'] or 0
+        if row.status == 'Resolved':
+            bucket['resolve_seconds'] += counts['resolve_seconds'] or 0
+            for name, _ in RESOLVE_BUCKETS:
+                bucket['buckets'][name] += counts[name] or 0
+        if row.status in OPEN_STATUSES:
+            bucket['net'] += (counts['entered'] or 0) - (counts['exited'] or 0)
+
+    trend = {'labels': [], 'opened': [], 'resolved': [], 'backlog': [],
+             'mean_hours': [], 'p50_hours': [], 'p90_hours': []}
+    for period, bucket in periods.items():
+        backlog += bucket['net']
+        resolved_count = sum(bucket['buckets'].values())
+        trend['labels'].append(period.strftime('%b %Y') if by == 'month' else period.isoformat())
+        trend['opened'].append(bucket['opened'])
+        trend['resolved'].append(resolved_count)
+        trend['backlog'].append(backlog)
+        trend['mean_hours'].append(round(bucket['resolve_seconds'] / resolved_count / 3600, 1) if resolved_count else None)
+        for key, fraction in (('p50_hours', 0.5), ('p90_hours', 0.9)):
+            value = _percentile(bucket['buckets'], resolved_count, fraction)
+            trend[key].append(round(value / 3600, 1) if value is not None else None)
+    return trend
+
+
+def last_twelve_months():
+    """[start, end) covering the current IST month and the eleven before it"""
+    today = _day(None)
+    end = (today.replace(day=1) + timedelta(days=32)).replace(day=1)
+    start = today.replace(day=1)
+    for _ in range(11):
+        start = (start - timedelta(days=1)).replace(day=1)
+    return start, end
+
+
+@app.cli.command('rebuild-rollups')
+def rebuild_rollups_command():
+    """Recompute the daily ticket rollups from the tickets table"""
+    total = rebuild_rollups()
+    logging.info(f"Ticket rollups rebuilt from {total} tickets")
+    print(f"Rebuilt rollups from {total} tickets")
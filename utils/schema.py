@@ -0,0 +1,114 @@
+import logging
+import click
+from sqlalchemy import inspect, text
+from app import app, db
+
+
+def add_missing_columns():
+    """Add columns that exist on the models but not yet in the database
+
+    create_all() only creates missing tables, so columns added to existing
+    models would otherwise never reach databases created by older versions.
+    Only nullable columns and NOT NULL columns with a server default can be
+    added; returns the (table, column) names added.
+    """
+    inspector = inspect(db.engine)
+    dialect = db.engine.dialect
+    added = []
+    with db.engine.begin() as conn:
+        for table in db.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or (not column.nullable and column.server_default is None):
+                    continue
+                column_type = column.type.compile(dialect=dialect)
+                if column.server_default is not None:
+                    column_type += f' NOT NULL DEFAULT {column.server_default.arg}'
+                conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                logging.info(f"Added column {table.name}.{column.name}")
+                added.append((table.name, column.name))
+    return added
+
+
+def init_schema():
+    """Create or upgrade tables, columns, indexes and the search schema"""
+    # Make sure to import the models here or their tables won't be created
+    import models  # noqa: F401
+    from utils.comments import rebuild_comment_counters
+    from utils.search import ensure_search_schema
+
+    db.create_all()
+    logging.info("Database tables created")
+
+    # Columns added to existing models since the database was created
+    added = add_missing_columns()
+    if ('tickets', 'comment_count') in added:
+        logging.info(f"Counted comments of {rebuild_comment_counters()} tickets")
+
+    # Full-text search column/index or FTS table for pre-existing databases
+    ensure_search_schema()
+
+    # create_all() skips indexes on tables that already exist
+    for table in db.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+
+    # Superseded by idx_comments_ticket_created_id
+    with db.engine.begin() as conn:
+        conn.execute(text('DROP INDEX IF EXISTS idx_comments_ticket_id'))
+
+
+def create_default_admin():
+    """Create default super admin and test user if none exists"""
+    from models import User
+
+    try:
+        super_admin = User.query.filter_by(role='super_admin').first()
+        if not super_admin:
+            # Create Super Admin
+            super_admin_user = User(
+                username='superadmin',
+                email='superadmin@gtnengineering.com',
+                first_name='Super',
+                last_name='Administrator',
+                department='IT',
+                role='super_admin'
+            )
+            super_admin_user.set_password('super123')
+            db.session.add(super_admin_user)
+            db.session.commit()
+            
+            # Create a test user
+            test_user = User(
+                username='testuser',
+                email='user@gtnengineering.com',
+                first_name='Test',
+                last_name='User',
+                department='Engineering',
+                role='user'
+            )
+            test_user.set_password('test123')
+            db.session.add(test_user)
+            db.session.commit()
+            
+            logging.info("Default super admin and test user created")
+    except Exception as e:
+        logging.error(f"Error creating default users: {e}")
+        db.session.rollback()
+
+
+def init_db(seed=True):
+    """Schema plus, optionally, the default accounts; safe to run on every deploy"""
+    init_schema()
+    if seed:
+        create_default_admin()
+
+
+@app.cli.command('init-db')
+@click.option('--no-seed', is_flag=True, help="Don't create the default super admin and test user")
+def init_db_command(no_seed):
+    """Create or upgrade the database schema and the default accounts"""
+    init_db(seed=not no_seed)
+    print("Database initialised")
@@ -0,0 +1,119 @@
+import logging
+import re
+from sqlalchemy import bindparam, column, func, literal_column, or_, table, text
+from app import app, db
+from models import Ticket
+
+SEARCH_CONFIG = 'english'
+
+tickets_fts = table('tickets_fts', column('rowid'))
+
+_PG_REFRESH = text(f"""
+    UPDATE tickets SET search_vector =
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(description, '')), 'B') ||
+        setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(
+            (SELECT string_agg(c.comment, ' ') FROM ticket_comments c WHERE c.ticket_id = tickets.id), ''
+        )), 'C')
+    WHERE id IN :ids
+""").bindparams(bindparam('ids', expanding=True))
+
+_SQLITE_DELETE = text("DELETE FROM tickets_fts WHERE rowid IN :ids").bindparams(bindparam('ids', expanding=True))
+
+_SQLITE_INSERT = text("""
+    INSERT INTO tickets_fts (rowid, title, description, comments)
+    SELECT t.id, t.title, t.description,
+           coalesce((SELECT group_concat(c.comment, ' ') FROM ticket_comments c WHERE c.ticket_id = t.id), '')
+    FROM tickets t WHERE t.id IN :ids
+""").bindparams(bindparam('ids', expanding=True))
+
+
+def _dialect():
+    return db.session.get_bind().dialect.name
+
+
+def ensure_search_schema():
+    """Add the search column/index or FTS table to databases created before search existed"""
+    dialect = _dialect()
+    if dialect == 'postgresql':
+        db.session.execute(text("ALTER TABLE tickets ADD COLUMN IF NOT EXISTS search_vector tsvector"))
+        db.session.execute(text(
+            "CREATE INDEX IF NOT EXISTS idx_tickets_search_vector ON tickets USING GIN (search_vector)"
+        ))
+    elif dialect == 'sqlite':
+        db.session.execute(text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS tickets_fts "
+            "USING fts5(title, description, comments, tokenize='porter unicode61')"
+        ))
+    db.session.commit()
+
+
+def refresh_ticket_search(*ticket_ids):
+    """Recompute the search document for the given tickets in the current transaction"""
+    ids = [ticket_id for ticket_id in ticket_ids if ticket_id is not None]
+    if not ids:
+        return
+    dialect = _dialect()
+    if dialect == 'postgresql':
+        db.session.execute(_PG_REFRESH, {'ids': ids})
+    elif dialect == 'sqlite':
+        db.session.execute(_SQLITE_DELETE, {'ids': ids})
+        db.session.execute(_SQLITE_INSERT, {'ids': ids})
+
+
+def rebuild_search_index(batch_size=1000):
+    """Backfill the search documents of every ticket, committing per batch"""
+    last_id = 0
+    total = 0
+    while True:
+        ids = [row.id for row in db.session.query(Ticket.id)
+               .filter(Ticket.id > last_id).order_by(Ticket.id).limit(batch_size)]
+        if not ids:
+            break
+        refresh_ticket_search(*ids)
+        db.session.commit()
+        last_id = ids[-1]
+        total += len(ids)
+    return total
+
+
+def _fts5_terms(search_query):
+    """Turn free text into a safe FTS5 query: every word must match, the last one as a prefix"""
+    words = re.findall(r'\w+', search_query)
+    if not words:
+        return None
+    quoted = ['"%s"' % word for word in words]
+    quoted[-1] += '*'
+    return ' '.join(quoted)
+
+
+def search_tickets(query, search_query):
+    """Restrict a Ticket query to full-text matches, ordered by relevance"""
+    dialect = _dialect()
+    if dialect == 'postgresql':
+        tsquery = func.websearch_to_tsquery(SEARCH_CONFIG, search_query)
+        rank = func.ts_rank_cd(Ticket.search_vector, tsquery)
+        return (query.filter(Ticket.search_vector.op('@@')(tsquery))
+                .order_by(rank.desc(), Ticket.created_at.desc()))
+    if dialect == 'sqlite':
+        terms = _fts5_terms(search_query)
+        if terms is None:
+            return query.filter(db.false())
+        fts = literal_column('tickets_fts')
+        # bm25 weights: title 10, description 5, comments 1 (lower score = better)
+        rank = func.bm25(fts, 10.0, 5.0, 1.0)
+        return (query.join(tickets_fts, tickets_fts.c.rowid == Ticket.id)
+                .filter(fts.op('MATCH')(terms))
+                .order_by(rank, Ticket.created_at.desc()))
+    # No full-text engine available: fall back to substring matching
+    return (query.filter(or_(Ticket.title.contains(search_query), Ticket.description.contains(search_query)))
+            .order_by(Ticket.created_at.desc()))
+
+
+@app.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """Create any missing search schema and re-index all tickets"""
+    ensure_search_schema()
+    total = rebuild_search_index()
+    logging.info(f"Search index rebuilt for {total} tickets")
+    print(f"Indexed {total} tickets")
@@ -0,0 +1,135 @@
+import threading
+import time
+from sqlalchemy import func, literal, null, union_all
+from flask import current_app
+from app import db
+from models import User, Ticket
+
+STATUSES = ('Open', 'In Progress', 'Resolved', 'Closed')
+CATEGORIES = ('Hardware', 'Software', 'Network', 'Other')
+PRIORITIES = ('Critical', 'High', 'Medium', 'Low')
+
+_lock = threading.Lock()
+_cached = None
+_cached_at = 0.0
+_cached_version = None
+_generation = 0
+
+
+def _load_stats():
+    """Compute every dashboard breakdown with a single grouped query"""
+    ticket_groups = db.select(
+        literal('ticket').label('kind'),
+        Ticket.status.label('status'),
+        Ticket.category.label('category'),
+        Ticket.priority.label('priority'),
+        func.count(Ticket.id).label('total')
+    ).group_by(Ticket.status, Ticket.category, Ticket.priority)
+
+    user_groups = db.select(
+        literal('user').label('kind'),
+        User.role.label('status'),
+        null().label('category'),
+        null().label('priority'),
+        func.count(User.id).label('total')
+    ).group_by(User.role)
+
+    stats = {
+        'total_tickets': 0,
+        'status': dict.fromkeys(STATUSES, 0),
+        'category': dict.fromkeys(CATEGORIES, 0),
+        'priority': dict.fromkeys(PRIORITIES, 0),
+        'roles': {},
+    }
+    for kind, status, category, priority, total in db.session.execute(union_all(ticket_groups, user_groups)):
+        if kind == 'user':
+            stats['roles'][status] = total
+            continue
+        stats['total_tickets'] += total
+        stats['status'][status] = stats['status'].get(status, 0) + total
+        stats['category'][category] = stats['category'].get(category, 0) + total
+        stats['priority'][priority] = stats['priority'].get(priority, 0) + total
+    return stats
+
+
+def get_ticket_stats(version=None):
+    """Return cached ticket/user breakdowns, reloading when stale or invalidated
+
+    Callers that know the current data version (e.g. an API watermark) pass it
+    so a cache filled before a write in another worker is not served as current.
+    """
+    global _cached, _cached_at, _cached_version
+    ttl = current_app.config.get('STATS_CACHE_TTL', 30)
+    with _lock:
+        if (_cached is not None and time.monotonic() - _cached_at < ttl
+                and (version is None or version == _cached_version)):
+            return _cached
+        generation = _generation
+    stats = _load_stats()
+    with _lock:
+        # Don't store a result that raced with an invalidation
+        if generation == _generation:
+            _cached = stats
+            _cached_at = time.monotonic()
+            _cached_version = version
+    return stats
+
+
+def invalidate_ticket_stats():
+    """Drop the cached stats after a write that changes ticket or user counts"""
+    global _cached, _generation
+    with _lock:
+        _cached = None
+        _generation += 1
+
+
+def dashboard_counters(stats):
+    """Flatten ticket stats into the counters shown on the admin dashboard cards"""
+    return {
+        'total_tickets': stats['total_tickets'],
+        'open_tickets': stats['status']['Open'],
+        'in_progress_tickets': stats['status']['In Progress'],
+        'resolved_tickets': stats['status']['Resolved'],
+        'total_users': stats['roles'].get('user', 0),
+        'total_admins': stats['roles'].get('admin', 0),
+        'hardware_tickets': stats['category']['Hardware'],
+        'software_tickets': stats['category']['Software'],
+    }
+
+
+def user_status_counts(user_id):
+    """Per-status ticket counts for one user's dashboard, in one grouped query"""
+    return dict(
+        db.session.query(Ticket.status, func.count(Ticket.id))
+        .filter(Ticket.user_id == user_id)
+        .group_by(Ticket.status)
+        .all()
+    )
+
+
+def report_counters(stats):
+    """Flatten ticket stats into the counters shown on the reports dashboard"""
+    return {
+        'total_tickets': stats['total_tickets'],
+        'open_tickets': stats['status']['Open'],
+        'in_progress_tickets': stats['status']['In Progress'],
+        'resolved_tickets': stats['status']['Resolved'],
+        'closed_tickets': stats['status']['Closed'],
+        'hardware_tickets': stats['category']['Hardware'],
+        'software_tickets': stats['category']['Software'],
+        'network_tickets': stats['category']['Network'],
+        'other_tickets': stats['category']['Other'],
+        'critical_tickets': stats['priority']['Critical'],
+        'high_tickets': stats['priority']['High'],
+        'medium_tickets': stats['priority']['Medium'],
+        'low_tickets': stats['priority']['Low'],
+    }
+
+
+def report_chart_data(stats):
+    """Series for the reports dashboard charts, in the fixed label order"""
+    return {
+        'category': [stats['category'][c] for c in CATEGORIES],
+        'priority': [stats['priority'][p] for p in PRIORITIES],
+        'status': [stats['status'][st] for st in STATUSES],
+    }
@@ -0,0 +1,180 @@
+import hashlib
+import mimetypes
+import os
+import shutil
+import tempfile
+from flask import Request, current_app, request, send_file
+from werkzeug.exceptions import NotFound, RequestEntityTooLarge
+from werkzeug.security import safe_join
+from utils.metrics import inc
+
+CHUNK_SIZE = 64 * 1024
+
+# Mode a plain open() would give a new file. NamedTemporaryFile makes files
+# 0600, and blobs are hard links to them, which a front proxy serving
+# UPLOAD_OFFLOAD as another user couldn't read. Read once at import: changing
+# the umask to read it isn't safe once request threads are running.
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+FILE_MODE = 0o666 & ~_UMASK
+
+
+class HashingUploadFile:
+    """Disk-backed file that an upload is streamed into, hashed as it is written
+
+    Werkzeug writes each multipart file here chunk by chunk while parsing the
+    request, so the bytes go straight to the upload volume and the SHA-256 and
+    size are known without reading the file a second time.
+    """
+
+    def __init__(self, directory, max_size=None):
+        os.makedirs(directory, exist_ok=True)
+        self._file = tempfile.NamedTemporaryFile(dir=directory, prefix='upload-', suffix='.part')
+        self._hash = hashlib.sha256()
+        self.size = 0
+        self.max_size = max_size
+
+    def write(self, data):
+        self.size += len(data)
+        if self.max_size and self.size > self.max_size:
+            self._file.close()
+            raise RequestEntityTooLarge(f'Each file must be at most {self.max_size // (1024 * 1024)} MB.')
+        self._hash.update(data)
+        return self._file.write(data)
+
+    @property
+    def sha256(self):
+        return self._hash.hexdigest()
+
+    def __getattr__(self, name):
+        return getattr(self._file, name)
+
+    def __iter__(self):
+        return iter(self._file)
+
+
+class UploadRequest(Request):
+    """Request class that streams file uploads into hashing temp files on the upload volume"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return HashingUploadFile(temp_folder(), current_app.config['MAX_UPLOAD_SIZE'])
+
+
+def upload_folder():
+    return current_app.config['UPLOAD_FOLDER']
+
+
+def temp_folder():
+    # Same filesystem as the blobs so finished uploads can be hard-linked into place
+    return os.path.join(upload_folder(), 'tmp')
+
+
+def blob_path(sha256):
+    """Content-addressed location of a stored file"""
+    return os.path.join(upload_folder(), 'blobs', sha256[:2], sha256)
+
+
+def upload_path(filename, sha256=None):
+    """Where an upload's bytes live: its blob, or the flat folder for legacy uploads"""
+    if sha256:
+        return blob_path(sha256)
+    path = safe_join(upload_folder(), filename)
+    if path is None:
+        raise NotFound()
+    return path
+
+
+def _hash_copy(stream, directory):
+    """Fallback for streams not parsed by UploadRequest: copy to a temp file in chunks"""
+    target = HashingUploadFile(directory)
+    stream.seek(0)
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        target.write(chunk)
+    return target
+
+
+def store_upload(file):
+    """Persist an uploaded FileStorage once per distinct content; returns (sha256, size)"""
+    stream = file.stream
+    copied = not isinstance(stream, HashingUploadFile)
+    if copied:
+        stream = _hash_copy(stream, temp_folder())
+    try:
+        stream.flush()
+        inc('upload_bytes_total', stream.size)
+        path = blob_path(stream.sha256)
+        if not os.path.exists(path):
+            inc('upload_stored_bytes_total', stream.size)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            try:
+                # The temp file is removed when the request closes it; the link keeps the bytes
+                os.fchmod(stream.fileno(), FILE_MODE)
+                os.link(stream.name, path)
+            except FileExistsError:
+                pass  # a concurrent upload stored the same content first
+            except OSError:
+                tmp_path = f'{path}.{os.getpid()}.tmp'
+                shutil.copyfile(stream.name, tmp_path)
+                os.replace(tmp_path, path)
+        return stream.sha256, stream.size
+    finally:
+        if copied:
+            stream.close()
+
+
+def _offloaded_response(path, etag, download_name, as_attachment):
+    """Empty response telling the front proxy which file to send (it handles Range itself)"""
+    mimetype = mimetypes.guess_type(download_name)[0] or 'application/octet-stream'
+    response = current_app.response_class(mimetype=mimetype)
+    if etag:
+        response.set_etag(etag)
+        if request.if_none_match.contains(etag):
+            response.status_code = 304
+            return response
+    if as_attachment:
+        response.headers.set('Content-Disposition', 'attachment', filename=download_name)
+    if current_app.config['UPLOAD_OFFLOAD'] == 'x-accel-redirect':
+        relative = os.path.relpath(path, upload_folder()).replace(os.sep, '/')
+        response.headers['X-Accel-Redirect'] = current_app.config['UPLOAD_ACCEL_PREFIX'].rstrip('/') + '/' + relative
+    else:
+        response.headers['X-Sendfile'] = os.path.abspath(path)
+    return response
+
+
+def send_stored_file(path, etag=None, download_name=None, as_attachment=False):
+    """Send a file from the upload volume; a string etag marks it immutable
+
+    Immutable files get a strong ETag and a long private cache lifetime.
+    Range requests are honoured, or the transfer is handed to the front proxy
+    when UPLOAD_OFFLOAD is set.
+    """
+    if not os.path.isfile(path):
+        raise NotFound()
+    download_name = download_name or os.path.basename(path)
+
+    if current_app.config['UPLOAD_OFFLOAD']:
+        response = _offloaded_response(path, etag, download_name, as_attachment)
+    else:
+        response = send_file(path, download_name=download_name, as_attachment=as_attachment,
+                             etag=etag or True, conditional=True)
+
+    response.cache_control.no_cache = None
+    response.cache_control.private = True
+    if etag:
+        response.cache_control.max_age = current_app.config['UPLOAD_CACHE_MAX_AGE']
+        response.cache_control.immutable = True
+    else:
+        # Legacy files are revalidated with their mtime/size ETag
+        response.cache_control.no_cache = True
+    return response
+
+
+def send_upload(filename, sha256=None, download_name=None, as_attachment=False):
+    """Serve an upload once the caller has checked permissions
+
+    Content-addressed blobs never change, so their hash is the ETag.
+    """
+    return send_stored_file(upload_path(filename, sha256), sha256, download_name or filename, as_attachment)
@@ -0,0 +1,154 @@
+import hashlib
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from flask import current_app
+from utils.storage import upload_folder, upload_path
+
+# Bounding boxes of the generated previews
+THUMBNAIL_SIZES = {
+    'small': (160, 160),
+    'medium': (640, 640),
+}
+IMAGE_EXTENSIONS = ('.png', '.jpg', '.jpeg', '.gif', '.bmp')
+JPEG_QUALITY = 82
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+# Previews being rendered (path -> future), and previews that could not be
+# rendered, so repeated requests don't queue the same work again
+_pending = {}
+_failed = set()
+_pending_lock = threading.Lock()
+MAX_FAILED = 10000
+
+
+def is_image(filename):
+    return filename.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def _cache_key(filename, sha256):
+    # Identical images share previews; legacy uploads are keyed by name
+    return sha256 or hashlib.sha256(filename.encode()).hexdigest()
+
+
+def thumbnail_path(filename, sha256, size):
+    """On-disk cache location of one preview of an upload"""
+    key = _cache_key(filename, sha256)
+    return os.path.join(upload_folder(), 'thumbs', size, key[:2], f'{key}.jpg')
+
+
+def thumbnail_etag(filename, sha256, size):
+    return f'{_cache_key(filename, sha256)}-{size}'
+
+
+def render_thumbnail(source, target, box):
+    """Write a JPEG preview of source that fits in box (runs in a pool process)"""
+    from PIL import Image, ImageOps
+
+    with Image.open(source) as image:
+        # Let the JPEG decoder downscale while decoding; far cheaper for big photos
+        image.draft('RGB', box)
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail(box)
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background = Image.new('RGB', image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel('A'))
+            image = background
+        elif image.mode != 'RGB':
+            image = image.convert('RGB')
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        tmp_path = f'{target}.{os.getpid()}.tmp'
+        image.save(tmp_path, 'JPEG', quality=JPEG_QUALITY, optimize=True)
+    os.replace(tmp_path, target)
+    return target
+
+
+def _get_executor():
+    """Process pool for image decoding, created lazily once per process"""
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor_pid != os.getpid():
+            # spawn, not fork: forking a threaded web worker can deadlock the child
+            _executor = ProcessPoolExecutor(
+                max_workers=current_app.config['THUMBNAIL_WORKERS'],
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def _discard_executor(executor):
+    """Drop a pool whose worker died, so the next preview starts a fresh one"""
+    global _executor, _executor_pid
+    with _executor_lock:
+        if _executor is executor:
+            _executor = _executor_pid = None
+    executor.shutdown(wait=False)
+
+
+def _mark_failed(target):
+    # Caller holds _pending_lock
+    if len(_failed) >= MAX_FAILED:
+        _failed.clear()
+    _failed.add(target)
+
+
+def _finished(target, executor, future):
+    error = future.exception()
+    if isinstance(error, BrokenProcessPool):
+        _discard_executor(executor)
+    with _pending_lock:
+        _pending.pop(target, None)
+        if error:
+            _mark_failed(target)
+    if error:
+        logging.warning(f"Thumbnail generation failed: {error}")
+
+
+def _submit(filename, sha256, size):
+    source = upload_path(filename, sha256)
+    target = thumbnail_path(filename, sha256, size)
+    with _pending_lock:
+        if target in _pending or target in _failed:
+            return
+        # A pool broken by an earlier crash refuses work: replace it and try once more
+        for _ in range(2):
+            executor = _get_executor()
+            try:
+                future = executor.submit(render_thumbnail, source, target, THUMBNAIL_SIZES[size])
+                break
+            except BrokenProcessPool:
+                _discard_executor(executor)
+        else:
+            logging.warning(f"Thumbnail pool unavailable, not rendering {target}")
+            _mark_failed(target)
+            return
+        _pending[target] = future
+    future.add_done_callback(partial(_finished, target, executor))
+
+
+def schedule_thumbnails(filename, sha256=None):
+    """Queue every preview size of a new image upload; returns immediately"""
+    if not is_image(filename):
+        return
+    for size in THUMBNAIL_SIZES:
+        if not os.path.exists(thumbnail_path(filename, sha256, size)):
+            _submit(filename, sha256, size)
+
+
+def get_thumbnail(filename, sha256, size):
+    """Path of a cached preview; None if it is missing, after queueing it to be rendered"""
+    path = thumbnail_path(filename, sha256, size)
+    if os.path.exists(path):
+        return path
+    # Never wait for the pool here: that would hold a web worker for the whole render
+    _submit(filename, sha256, size)
+    return None
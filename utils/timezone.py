@@ -1,7 +1,22 @@
-from datetime import timedelta
+from datetime import datetime, timedelta
 
 def utc_to_ist(dt):
     """Convert a UTC datetime to IST (Indian Standard Time)."""
     if dt is None:
         return None
-    return dt + timedelta(hours=5, minutes=30)
\ No newline at end of file
+    return dt + timedelta(hours=5, minutes=30)
+
+def period_bounds(year, month=None, day=None):
+    """Half-open [start, end) datetime bounds of a calendar year, month or day.
+
+    Filtering with `start <= column < end` keeps the column bare, so a B-tree
+    index on it can be used (unlike extract('year', column) == n).
+    """
+    if day is not None:
+        start = datetime(year, month, day)
+        return start, start + timedelta(days=1)
+    if month is not None:
+        start = datetime(year, month, 1)
+        end = datetime(year + 1, 1, 1) if month == 12 else datetime(year, month + 1, 1)
+        return start, end
+    return datetime(year, 1, 1), datetime(year + 1, 1, 1)
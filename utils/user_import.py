@@ -0,0 +1,180 @@
+import csv
+import io
+import logging
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+import click
+from sqlalchemy import func, insert
+from werkzeug.security import generate_password_hash
+from app import app, db
+from models import User
+
+IMPORT_COLUMNS = ['username', 'email', 'first_name', 'last_name', 'department', 'role', 'password']
+REQUIRED_COLUMNS = ['username', 'email', 'first_name', 'last_name', 'password']
+ROLES = ('user', 'super_admin')
+EMAIL_PATTERN = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+
+# Below this many passwords in a batch, starting worker processes costs more than it saves
+POOL_THRESHOLD = 8
+
+
+class ImportResult:
+    """Outcome of a bulk import: users created and per-row errors as (line, message)"""
+
+    def __init__(self):
+        self.created = 0
+        self.errors = []
+
+    def error(self, line, message):
+        self.errors.append((line, message))
+
+
+def read_csv(text):
+    """(line number, row dict) pairs from CSV text; the first line is the header"""
+    reader = csv.DictReader(io.StringIO(text))
+    missing = [column for column in REQUIRED_COLUMNS if column not in (reader.fieldnames or [])]
+    if missing:
+        raise ValueError(f"CSV is missing column(s): {', '.join(missing)}")
+    for row in reader:
+        yield reader.line_num, {column: (row.get(column) or '').strip() for column in IMPORT_COLUMNS}
+
+
+def _validate(row, usernames, emails):
+    """Error message for one row, or None; the same limits as the create-user form"""
+    if not 3 <= len(row['username']) <= 80:
+        return 'username must be 3-80 characters'
+    if not EMAIL_PATTERN.match(row['email']) or len(row['email']) > 120:
+        return 'invalid email address'
+    for field in ('first_name', 'last_name'):
+        if not 2 <= len(row[field]) <= 50:
+            return f'{field} must be 2-50 characters'
+    if len(row['department']) > 100:
+        return 'department must be at most 100 characters'
+    if row['role'] not in ROLES:
+        return f"role must be one of: {', '.join(ROLES)}"
+    if len(row['password']) < 6:
+        return 'password must be at least 6 characters'
+    if row['username'] in usernames:
+        return f"username '{row['username']}' already exists"
+    if row['email'].lower() in emails:
+        return f"email '{row['email']}' already exists"
+    return None
+
+
+def _import_workers():
+    return app.config['USER_IMPORT_WORKERS'] or os.cpu_count() or 1
+
+
+def _hash_passwords(passwords, executor):
+    hasher = partial(generate_password_hash, method=app.config['PASSWORD_HASH_METHOD'])
+    if executor is None or len(passwords) < POOL_THRESHOLD:
+        return [hasher(password) for password in passwords]
+    chunksize = max(1, len(passwords) // (_import_workers() * 4))
+    return list(executor.map(hasher, passwords, chunksize=chunksize))
+
+
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+
+
+def _shared_executor():
+    """Process pool kept for the life of this process, or None when there is a single core to use
+
+    Starting spawn workers costs seconds, so every import reuses the same pool;
+    its processes are started on first use.
+    """
+    global _executor, _executor_pid
+    workers = _import_workers()
+    if workers < 2:
+        return None
+    with _executor_lock:
+        # Opened per process: gunicorn forks workers after import
+        if _executor is None or _executor_pid != os.getpid():
+            # spawn, not fork: forking a threaded web worker can deadlock the child
+            _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+            _executor_pid = os.getpid()
+        return _executor
+
+
+def _discard_executor(executor):
+    """Drop a pool whose worker died, so the next import starts a fresh one"""
+    global _executor
+    with _executor_lock:
+        if _executor is executor:
+            _executor = None
+    executor.shutdown(wait=False)
+
+
+def import_users(rows, batch_size=500):
+    """Create users from (line, row dict) pairs; invalid or duplicate rows are reported, not fatal
+
+    Existing usernames and emails are loaded once and checked in memory.
+    Passwords are hashed across a process pool, and each batch is written
+    with one multi-row INSERT. Everything commits in one transaction.
+    """
+    result = ImportResult()
+    existing = db.session.query(User.username, func.lower(User.email)).all()
+    usernames = {username for username, _ in existing}
+    emails = {email for _, email in existing}
+
+    executor = _shared_executor()
+    try:
+        batch = []
+        for line, row in rows:
+            row['role'] = row.get('role') or 'user'
+            message = _validate(row, usernames, emails)
+            if message:
+                result.error(line, message)
+                continue
+            # Reserve the names so later rows in the same file are caught as duplicates
+            usernames.add(row['username'])
+            emails.add(row['email'].lower())
+            batch.append(row)
+            if len(batch) >= batch_size:
+                result.created += _insert_batch(batch, executor)
+                batch = []
+        if batch:
+            result.created += _insert_batch(batch, executor)
+        db.session.commit()
+    except BrokenProcessPool:
+        db.session.rollback()
+        _discard_executor(executor)
+        raise
+    except Exception:
+        db.session.rollback()
+        raise
+    logging.info(f"Imported {result.created} users, {len(result.errors)} rows rejected")
+    return result
+
+
+def _insert_batch(batch, executor):
+    hashes = _hash_passwords([row['password'] for row in batch], executor)
+    db.session.execute(insert(User), [
+        {
+            'username': row['username'],
+            'email': row['email'],
+            'first_name': row['first_name'],
+            'last_name': row['last_name'],
+            'department': row['department'] or None,
+            'role': row['role'],
+            'password_hash': password_hash,
+        }
+        for row, password_hash in zip(batch, hashes)
+    ])
+    return len(batch)
+
+
+@app.cli.command('import-users')
+@click.argument('csv_file', type=click.File('r', encoding='utf-8-sig'))
+def import_users_command(csv_file):
+    """Create users from a CSV file (username,email,first_name,last_name,department,role,password)"""
+    result = import_users(read_csv(csv_file.read()))
+    for line, message in result.errors:
+        print(f"line {line}: {message}")
+    print(f"Created {result.created} users, {len(result.errors)} rows rejected")